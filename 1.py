@@ -1,20 +1,680 @@
 import sys
 import os
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QAction, QFileDialog,
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QAction, QFileDialog, QWidget,
                             QLabel, QInputDialog, QMessageBox, QColorDialog, QScrollArea, QPushButton)
-from PyQt5.QtGui import QPixmap, QPainter, QColor, QImage, QPen, QCursor, QIcon, QFont
-from PyQt5.QtCore import Qt, QPoint, QTemporaryFile, QEvent, QTimer
+from PyQt5.QtGui import QPixmap, QPixmapCache, QPainter, QColor, QRegion, QImage, QImageReader, QPen, QCursor, QIcon, QFont
+from PyQt5.QtCore import (Qt, QPoint, QPointF, QRect, QRectF, QSize, QTemporaryFile, QEvent, QTimer,
+                          QObject, QRunnable, QThreadPool, QFileSystemWatcher, pyqtSignal)
 from PIL import Image, ImageDraw
 import numpy as np
 import traceback
 import json
+import logging
+import logging.handlers
+import queue
+import atexit
+import functools
+import math
+import time
+import zlib
+from collections import OrderedDict, deque
 
 VERSION = "2025/11/9-06"
+MAX_HISTORY = 50  # 撤销记录的最大条数
+HISTORY_RAW_ENTRIES = 2  # 撤销栈和重做栈顶部不压缩的记录条数
+HISTORY_BYTES = 256 * 1024 * 1024  # 撤销与重做记录（压缩后）的总字节数上限（至少保留最近的一条）
+IMAGE_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg', '.bmp', '.gif', '.webp'})  # 支持的图片格式
+IMAGE_CACHE_SIZE = 5  # 已解码图片缓存的最大张数（当前图片及前后预读的图片）
+IMAGE_CACHE_BYTES = 512 * 1024 * 1024  # 已解码图片缓存的像素总字节数上限（至少保留最近的一张）
+LARGE_FILE_BYTES = 50 * 1024 * 1024  # 超过该大小的未压缩图片在完整解码前先显示取样预览
+PIXMAP_CACHE_LIMIT_KB = 256 * 1024  # QPixmapCache 的容量上限，平滑缩小的显示结果缓存在其中
+# 按扩展名选择的保存参数：PNG 用最快的压缩级别（文件略大，但编码快数倍），JPEG 固定高质量且不做色度抽样
+SAVE_OPTIONS = {
+    '.png': {'compress_level': 1},
+    '.jpg': {'quality': 92, 'subsampling': 0},
+    '.jpeg': {'quality': 92, 'subsampling': 0},
+}
+ALPHA_FORMATS = frozenset({'.png', '.bmp', '.gif', '.webp'})  # 可以保存透明度的格式
+BLUR_TILE_SIZE = 128  # 模糊结果按块缓存的块大小（像素）
+SNAPSHOT_TILE_SIZE = 128  # 笔画开始前像素快照的分块大小（像素），块在第一次被修改前才复制
+ERROR_NOTICE_INTERVAL = 1.0  # 高频处理函数出错时，界面提示的最短间隔（秒）
+
+logger = logging.getLogger(__name__)
+
+def log_exceptions(default=None):
+    """装饰器：记录异常并返回 default，不弹出对话框
+
+    用于鼠标事件、绘制等高频调用的函数，反复出现的错误不会每次都弹出模态对话框阻塞界面。
+    被装饰的是带 notify_error 的对象的方法时，同时显示一条限频的通知（窗口程序通常看不到日志输出）。
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                logger.exception('%s 失败', func.__qualname__)
+                notify = getattr(args[0], 'notify_error', None) if args else None
+                if notify is not None:
+                    try:
+                        notify(e)
+                    except Exception:
+                        logger.exception('显示错误通知失败')
+                return default
+        return wrapper
+    return decorator
+
+class _Delta:
+    """一条撤销/重做记录：bbox 区域内需要恢复的像素
+
+    新记录保存原始像素，撤销/重做最近几步时不必解压；不再位于栈顶附近时调用 compress
+    改为 zlib（level 1）压缩保存：笔画外接矩形里大部分是平坦或未改动的区域，
+    压缩很快且通常能缩小数倍，长时间编辑时撤销记录占用的内存也有上限。
+    """
+    def __init__(self, bbox, pixels):
+        self.bbox = bbox  # (left, top, right, bottom)，图像坐标
+        # 该区域的 RGBA 像素（撤销记录为编辑前，重做记录为编辑后，独立副本），压缩后为 None
+        self.pixels = pixels
+        self.data = None  # 压缩后的像素
+
+    @property
+    def nbytes(self):
+        return self.pixels.nbytes if self.pixels is not None else len(self.data)
+
+    def compress(self):
+        if self.pixels is not None:
+            self.data = zlib.compress(self.pixels.tobytes(), 1)
+            self.pixels = None
+
+    def swap(self, arr):
+        """把记录的像素写回 arr，同时换成 arr 中原来的像素（撤销与重做互相转换），返回修改区域"""
+        left, top, right, bottom = self.bbox
+        region = arr[top:bottom, left:right]
+        if self.pixels is not None:
+            pixels = self.pixels
+        else:
+            pixels = np.frombuffer(zlib.decompress(self.data), dtype=np.uint8).reshape(region.shape)
+            self.data = None
+        self.pixels = region.copy()
+        region[...] = pixels
+        return QRect(left, top, right - left, bottom - top)
+
+class _StrokeSnapshot:
+    """笔画开始前的像素快照（写时复制）
+
+    开始笔画时不复制整张图片：每个 SNAPSHOT_TILE_SIZE 的块在第一次被修改前才保存原始像素，
+    没有保存过的块在 arr 中仍是原样。修改 arr 之前必须先对该区域调用 protect。
+    """
+    def __init__(self, arr):
+        self.arr = arr
+        self.tiles = {}  # {(块x, 块y): 原始像素}
+
+    def _tiles_in(self, left, top, right, bottom):
+        t = SNAPSHOT_TILE_SIZE
+        for ty in range(top // t, (bottom - 1) // t + 1):
+            for tx in range(left // t, (right - 1) // t + 1):
+                yield tx, ty, tx * t, ty * t
+
+    def protect(self, left, top, right, bottom):
+        """即将修改 arr[top:bottom, left:right]：先保存其中尚未保存的块"""
+        height, width = self.arr.shape[:2]
+        left, top = max(0, left), max(0, top)
+        right, bottom = min(width, right), min(height, bottom)
+        if right <= left or bottom <= top:
+            return
+        t = SNAPSHOT_TILE_SIZE
+        for tx, ty, x0, y0 in self._tiles_in(left, top, right, bottom):
+            if (tx, ty) not in self.tiles:
+                self.tiles[(tx, ty)] = self.arr[y0:y0 + t, x0:x0 + t].copy()
+
+    def region(self, left, top, right, bottom):
+        """返回笔画开始前 [top:bottom, left:right] 区域的像素（独立副本，调用方需保证区域在图像内）"""
+        out = self.arr[top:bottom, left:right].copy()
+        for tx, ty, x0, y0 in self._tiles_in(left, top, right, bottom):
+            tile = self.tiles.get((tx, ty))
+            if tile is not None:
+                ix0, iy0 = max(left, x0), max(top, y0)
+                ix1, iy1 = min(right, x0 + tile.shape[1]), min(bottom, y0 + tile.shape[0])
+                out[iy0 - top:iy1 - top, ix0 - left:ix1 - left] = tile[iy0 - y0:iy1 - y0, ix0 - x0:ix1 - x0]
+        return out
+
+def qimage_to_array(qimage):
+    """把 QImage 转换为 (高, 宽, 4) 的 RGBA uint8 数组（独立副本，只复制一次）"""
+    qimage = qimage.convertToFormat(QImage.Format_RGBA8888)
+    width, height = qimage.width(), qimage.height()
+    bits = qimage.constBits()
+    bits.setsize(qimage.byteCount())
+    # 以 NumPy 视图读取 Qt 的像素内存，复制时顺便去掉行尾填充
+    pixels = np.frombuffer(bits, dtype=np.uint8).reshape(height, qimage.bytesPerLine() // 4, 4)
+    return pixels[:, :width].copy()
+
+def pil_to_array(image):
+    """把 PIL 图像转换为 (高, 宽, 4) 的 RGBA uint8 数组（独立、可写的副本）
+
+    RGBA 直接复制一次像素；RGB 由 NumPy 填入颜色并把 alpha 整体置为 255，
+    不经过 PIL 的逐像素模式转换；其他模式才交给 convert('RGBA')。
+    """
+    if image.mode == 'RGBA':
+        return np.array(image)
+    if image.mode == 'RGB':
+        pixels = np.empty((image.height, image.width, 4), dtype=np.uint8)
+        pixels[..., :3] = np.asarray(image)
+        pixels[..., 3] = 255
+        return pixels
+    return np.array(image.convert('RGBA'))
+
+def decode_image(file_path):
+    """读取图片文件并解码为 RGBA 像素数组（可在后台线程中调用）
+
+    返回 (文件修改时间, 像素数组)；修改时间在解码前读取，文件之后被改写时缓存会自然失效。
+    优先用 QImageReader 直接解码为 QImage，不经过 PIL 图像对象；
+    Qt 不支持的格式（或超过 Qt 的内存分配上限）时回退到 PIL。
+    """
+    mtime = os.stat(file_path).st_mtime_ns
+    reader = QImageReader(file_path)
+    reader.setAutoTransform(False)  # 与 PIL 一致，不按 EXIF 方向旋转，保存时像素不变
+    qimage = reader.read()
+    if not qimage.isNull():
+        return mtime, qimage_to_array(qimage)
+    with Image.open(file_path) as image:
+        return mtime, pil_to_array(image)
+
+def _bmp_preview(file_path, step):
+    """把未压缩的 24/32 位 BMP 映射到内存，每隔 step 个像素取一个作为预览
+
+    只有被取到的行才会从磁盘读入；不支持的 BMP（包括只有 12 字节 BITMAPCOREHEADER、
+    尺寸为 16 位的旧格式）返回 None。
+    """
+    with open(file_path, 'rb') as f:
+        header = f.read(34)
+    if len(header) < 34 or header[:2] != b'BM':
+        return None
+    offset = int.from_bytes(header[10:14], 'little')
+    header_size = int.from_bytes(header[14:18], 'little')
+    if header_size < 40:
+        return None  # 以下字段按 BITMAPINFOHEADER 及更新版本的布局读取
+    width = int.from_bytes(header[18:22], 'little', signed=True)
+    height = int.from_bytes(header[22:26], 'little', signed=True)
+    bpp = int.from_bytes(header[28:30], 'little')
+    compression = int.from_bytes(header[30:34], 'little')
+    if bpp not in (24, 32) or compression != 0 or width <= 0 or height == 0:
+        return None
+    channels = bpp // 8
+    stride = (width * bpp + 31) // 32 * 4  # 每行按 4 字节对齐
+    rows = np.memmap(file_path, dtype=np.uint8, mode='r', offset=offset,
+                     shape=(abs(height), stride))
+    if height > 0:
+        rows = rows[::-1]  # 高度为正时像素行自下而上存放
+    sampled = rows[::step, :width * channels].reshape(-1, width, channels)[:, ::step]
+    pixels = np.empty(sampled.shape[:2] + (4,), dtype=np.uint8)
+    pixels[..., :3] = sampled[..., 2::-1]  # BGR -> RGB
+    pixels[..., 3] = 255
+    return (width, abs(height)), pixels
+
+def decode_preview(file_path, scale):
+    """按显示比例 scale 缩小解码一张预览
+
+    JPEG 由 libjpeg 直接以 1/2~1/8 分辨率解码；超过 LARGE_FILE_BYTES 的未压缩 BMP
+    通过内存映射隔行取样，不必读入整个文件。
+    返回 (原图尺寸, RGBA 像素数组)；其他格式或无法缩小解码时返回 None。
+    像素在工作线程中就取出成数组，GUI 线程直接用它构造 QImage，不再 tobytes 复制。
+    """
+    if file_path.lower().endswith('.bmp'):
+        if os.path.getsize(file_path) <= LARGE_FILE_BYTES:
+            return None
+        return _bmp_preview(file_path, max(2, int(1 / scale)))
+    with Image.open(file_path) as image:
+        if image.format != 'JPEG':
+            return None
+        size = image.size
+        image.draft('RGB', (max(1, int(size[0] * scale)), max(1, int(size[1] * scale))))
+        if image.size == size:
+            return None
+        return size, pil_to_array(image)
+
+class _DecodeSignals(QObject):
+    loaded = pyqtSignal(str, object, object, object, str)  # (路径, 文件修改时间, RGBA 像素数组, 可编辑副本或 None, 错误信息)
+    preview = pyqtSignal(str, object, object)  # (路径, 原图尺寸, 缩小解码的预览像素数组)
+
+class _DecodeTask(QRunnable):
+    """在线程池中解码一张图片（加载或预读），完成后通过信号交回 GUI 线程
+
+    preview_scale 小于 1 时，先以该显示比例缩小解码一张预览，再完整解码。
+    editable 为 True（要立即显示的图片）时，顺便在工作线程中复制一份供编辑的像素，
+    缓存中的像素保持不变，GUI 线程不必再做整图复制。
+    """
+    def __init__(self, path, signals, preview_scale=None, editable=False):
+        super().__init__()
+        self.path = path
+        self.signals = signals
+        self.preview_scale = preview_scale
+        self.editable = editable
+
+    def run(self):
+        if self.preview_scale:
+            try:
+                preview = decode_preview(self.path, self.preview_scale)
+                if preview is not None:
+                    self.signals.preview.emit(self.path, *preview)
+            except Exception as e:
+                logger.warning("解码预览失败: %s: %s", self.path, e)
+
+        mtime, image, editable, error = None, None, None, ''
+        try:
+            mtime, image = decode_image(self.path)
+            if self.editable:
+                editable = image.copy()
+        except Exception as e:
+            logger.exception("解码图片失败: %s", self.path)
+            error = str(e) or type(e).__name__
+        self.signals.loaded.emit(self.path, mtime, image, editable, error)
+
+class _SaveSignals(QObject):
+    finished = pyqtSignal(str, str)  # (路径, 错误信息，成功时为空)
+
+class _SaveTask(QRunnable):
+    """在线程池中把像素快照编码保存到文件"""
+    def __init__(self, path, pixels, signals):
+        super().__init__()
+        self.path = path
+        self.pixels = pixels  # RGBA 像素的独立副本，保存期间界面可以继续编辑
+        self.signals = signals
+
+    def run(self):
+        error = ''
+        try:
+            ext = os.path.splitext(self.path)[1].lower()
+            if ext in ALPHA_FORMATS and self.pixels[..., 3].min() < 255:
+                image = Image.fromarray(self.pixels, 'RGBA')
+            else:
+                # 完全不透明（或格式不支持透明度，如 JPEG）时去掉 alpha 通道再编码
+                image = Image.fromarray(np.ascontiguousarray(self.pixels[..., :3]), 'RGB')
+            image.save(self.path, **SAVE_OPTIONS.get(ext, {}))
+        except Exception as e:
+            logger.exception("保存图片失败: %s", self.path)
+            error = str(e) or type(e).__name__
+        self.signals.finished.emit(self.path, error)
+
+def move_to_trash(file_path):
+    """把文件移动到回收站（无确认框），失败时抛出异常"""
+    try:
+        from send2trash import send2trash
+    except ImportError:
+        # 如果没有 send2trash 库，使用 win32api
+        import win32api
+        import win32con
+        # FOF_ALLOWUNDO: 允许撤销（移到回收站）
+        # FOF_NOCONFIRMATION: 不显示确认对话框
+        # FOF_SILENT: 静默操作
+        result = win32api.SHFileOperation((
+            0,  # hwnd
+            win32con.FO_DELETE,  # 操作类型：删除
+            file_path,  # 源文件
+            None,  # 目标（删除操作不需要）
+            win32con.FOF_ALLOWUNDO | win32con.FOF_NOCONFIRMATION | win32con.FOF_SILENT,  # 标志
+            None,  # 进度标题
+            None   # 进度文本
+        ))
+        if result != 0:
+            raise OSError(f"SHFileOperation 返回 {result}")
+    else:
+        send2trash(file_path)
+
+def can_restore_from_trash():
+    """当前平台能否用 restore_from_trash 从回收站恢复文件（不能时删除前需要另做备份）"""
+    if sys.platform == 'win32':
+        try:
+            import winshell  # noqa: F401
+        except ImportError:
+            return False
+        return True
+    # Linux 等平台上 send2trash 使用 freedesktop.org 回收站规范
+    return sys.platform != 'darwin'
+
+def _freedesktop_trash_dirs(file_path):
+    """返回 send2trash 可能放置该文件的回收站目录及其路径基准目录 [(回收站, 基准目录)]"""
+    data_home = os.path.expanduser(os.environ.get('XDG_DATA_HOME') or '~/.local/share')
+    dirs = [(os.path.join(data_home, 'Trash'), data_home)]
+    top = os.path.dirname(os.path.abspath(file_path))
+    while not os.path.ismount(top):
+        top = os.path.dirname(top)
+    uid = str(os.getuid())
+    dirs.append((os.path.join(top, '.Trash', uid), top))
+    dirs.append((os.path.join(top, '.Trash-' + uid), top))
+    return dirs
+
+def restore_from_trash(file_path):
+    """把最近一次移到回收站的 file_path 恢复到原位置，成功返回 True"""
+    file_path = os.path.normpath(os.path.abspath(file_path))
+    if os.path.exists(file_path):
+        return False
+    try:
+        if sys.platform == 'win32':
+            import winshell
+            winshell.undelete(file_path)
+            return os.path.exists(file_path)
+
+        from urllib.parse import unquote
+        latest = None  # (删除时间, 回收站中的文件, .trashinfo 文件)
+        for trash_dir, top in _freedesktop_trash_dirs(file_path):
+            info_dir = os.path.join(trash_dir, 'info')
+            if not os.path.isdir(info_dir):
+                continue
+            for entry in os.scandir(info_dir):
+                if not entry.name.endswith('.trashinfo'):
+                    continue
+                fields = {}
+                with open(entry.path, encoding='utf-8') as f:
+                    for line in f:
+                        key, sep, value = line.strip().partition('=')
+                        if sep:
+                            fields[key] = value
+                original = unquote(fields.get('Path', ''))
+                if not original:
+                    continue
+                original = os.path.normpath(os.path.join(top, original))
+                if original == file_path and (latest is None or fields.get('DeletionDate', '') > latest[0]):
+                    trashed = os.path.join(trash_dir, 'files', entry.name[:-len('.trashinfo')])
+                    latest = (fields.get('DeletionDate', ''), trashed, entry.path)
+        if latest is None or not os.path.exists(latest[1]):
+            return False
+        import shutil
+        shutil.move(latest[1], file_path)
+        os.remove(latest[2])
+        return True
+    except Exception as e:
+        logger.warning("从回收站恢复失败: %s: %s", file_path, e)
+        return False
+
+def numbered_path(path):
+    """返回 path 加编号后（name_1.ext、name_2.ext…）不存在的路径
+
+    先按 1、2、4、8… 找到一个不存在的编号，再在最后一个已存在的编号与它之间二分查找，
+    已有大量编号文件时只需 O(log N) 次 stat；编号不连续时返回的不一定是最小的空闲编号。
+    """
+    name, ext = os.path.splitext(path)
+    def exists(counter):
+        return os.path.exists(f"{name}_{counter}{ext}")
+    low, high = 0, 1  # 编号 low 已存在（0 表示原路径），编号 high 待检查
+    while exists(high):
+        low, high = high, high * 2
+    while high - low > 1:
+        middle = (low + high) // 2
+        if exists(middle):
+            low = middle
+        else:
+            high = middle
+    return f"{name}_{high}{ext}"
+
+def create_unique_file(path):
+    """以独占方式创建空文件 path，已存在时改用 numbered_path 给出的编号路径，返回实际创建的路径
+
+    检查与创建是同一次 O_EXCL 调用：同时进行的两次复制不会选中同一个名字而互相覆盖。
+    """
+    candidate = path
+    while True:
+        try:
+            os.close(os.open(candidate, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return candidate
+        except FileExistsError:
+            candidate = numbered_path(path)  # 编号路径刚被别人占用时重新查找
+
+def copy_file(src, dst):
+    """复制文件内容和元数据（与 shutil.copy2 相同）；可在后台线程中调用
+
+    Linux 上优先用 os.copy_file_range，数据留在内核中，btrfs/XFS 等文件系统上还可能直接共享数据块，
+    NFS 上可由服务器端完成复制；不支持时退回 shutil.copy2（它在各平台上也会尽量使用零拷贝）。
+    """
+    import shutil
+    if hasattr(os, 'copy_file_range'):
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            pass  # 跨文件系统（旧内核）或文件系统不支持，改用普通复制
+    shutil.copy2(src, dst)
+
+class _DeleteSignals(QObject):
+    finished = pyqtSignal(str, str, str, str)  # (路径, 备份路径, 副本的实际路径（未复制时为空）, 错误信息，成功时为空)
+
+class _DeleteTask(QRunnable):
+    """在线程池中备份文件（仅在无法从回收站恢复时）并移动到回收站，完成后通过信号通知 GUI 线程
+
+    copy_to 不为空时先把文件复制到该路径（已存在时改用编号路径，名字在创建文件时才确定），复制失败则不删除。
+    """
+    def __init__(self, path, backup_path, signals, copy_to=''):
+        super().__init__()
+        self.path = path
+        self.backup_path = backup_path
+        self.signals = signals
+        self.copy_to = copy_to
+
+    def run(self):
+        import shutil
+        error, copied = '', ''
+        try:
+            if self.copy_to:
+                destination = create_unique_file(self.copy_to)
+                try:
+                    copy_file(self.path, destination)
+                except Exception as e:
+                    # 不留下不完整的副本（该文件是上面刚创建的，不会误删别的文件）
+                    try:
+                        os.remove(destination)
+                    except OSError:
+                        pass
+                    raise OSError(f"复制到 {destination} 失败: {e}") from e
+                copied = destination
+            if self.backup_path:
+                try:
+                    # 同一分区时用硬链接作为备份，不必复制文件内容
+                    if os.path.lexists(self.backup_path):
+                        os.remove(self.backup_path)
+                    os.link(self.path, self.backup_path)
+                except OSError:
+                    shutil.copy2(self.path, self.backup_path)
+            move_to_trash(self.path)
+        except Exception as e:
+            logger.exception("删除文件失败: %s", self.path)
+            error = str(e) or type(e).__name__
+        self.signals.finished.emit(self.path, self.backup_path, copied, error)
+
+def scan_directory_images(directory):
+    """扫描目录（已规范化），返回 (目录修改时间, 按文件名排序的图片路径列表)；可在后台线程中调用
+
+    修改时间在扫描前读取，扫描期间目录被修改时缓存会在下次检查时失效。
+    """
+    mtime = os.stat(directory).st_mtime
+    # DirEntry 自带类型信息，多数平台上不需要再逐个 stat；目录已规范化，entry.path 无需再 normpath
+    with os.scandir(directory) as entries:
+        files = [entry.path for entry in entries
+                 if os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS
+                 and entry.is_file()]
+    files.sort()
+    return mtime, files
+
+class _ListSignals(QObject):
+    listed = pyqtSignal(str, object, object)  # (目录, 目录修改时间, 图片路径列表；失败时均为 None)
+
+class _ListTask(QRunnable):
+    """在线程池中扫描目录中的图片（网络驱动器上可能很慢），完成后通过信号交回 GUI 线程"""
+    def __init__(self, directory, signals):
+        super().__init__()
+        self.directory = directory
+        self.signals = signals
 
-class DraggableButton(QPushButton):
+    def run(self):
+        mtime, files = None, None
+        try:
+            mtime, files = scan_directory_images(self.directory)
+        except OSError as e:
+            logger.warning("扫描目录失败: %s: %s", self.directory, e)
+        self.signals.listed.emit(self.directory, mtime, files)
+
+class ImageCanvas(QWidget):
+    """显示图片的控件，每次只绘制需要重绘（可见）的区域
+
+    pixmap 按 scale 缩放后居中显示；缩放在绘制时进行，放大显示时不会生成整张放大后的 pixmap。
+    控件自己绘制全部背景（WA_OpaquePaintEvent），滚动时 Qt 可以直接平移已绘制的内容，
+    只重绘新露出的一条区域，而不是整个视口。
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+        self._pixmap = None
+        self._scale = 1.0
+        self._smooth = True
+        self._display_size = QSize(0, 0)
+
+    def set_pixmap(self, pixmap, scale=1.0, smooth=True):
+        """显示 pixmap（直接引用，不复制）；之后修改了 pixmap 的像素请调用 update_pixmap_rect"""
+        self._pixmap = pixmap
+        self._scale = scale
+        self._smooth = smooth
+        size = QSize(int(pixmap.width() * scale), int(pixmap.height() * scale))
+        if size != self._display_size:
+            self._display_size = size
+            self.updateGeometry()
+            self.resize(self.size().expandedTo(size))
+        self.update()
+
+    def pixmap(self):
+        return self._pixmap
+
+    def clear(self):
+        self._pixmap = None
+        self._display_size = QSize(0, 0)
+        self.updateGeometry()
+        self.update()
+
+    def display_size(self):
+        """图片缩放后的显示尺寸"""
+        return QSize(self._display_size)
+
+    def image_offset(self):
+        """图片居中显示时左上角在控件中的位置"""
+        return QPoint(max(0, (self.width() - self._display_size.width()) // 2),
+                      max(0, (self.height() - self._display_size.height()) // 2))
+
+    def update_pixmap_rect(self, rect):
+        """pixmap 中 rect 区域（pixmap 坐标）的像素已改变，只重绘对应的显示区域"""
+        offset = self.image_offset()
+        s = self._scale
+        target = QRectF(offset.x() + rect.x() * s, offset.y() + rect.y() * s,
+                        rect.width() * s, rect.height() * s)
+        self.update(target.toAlignedRect().adjusted(-1, -1, 1, 1))
+
+    def sizeHint(self):
+        return QSize(self._display_size)
+
+    def minimumSizeHint(self):
+        return QSize(self._display_size)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        background = self.palette().color(self.backgroundRole())
+        if self._pixmap is None or self._pixmap.isNull():
+            painter.fillRect(event.rect(), background)
+            return
+        offset = self.image_offset()
+        image_rect = QRect(offset, self._display_size)
+        target = event.rect().intersected(image_rect)
+        if self._pixmap.hasAlphaChannel():
+            # 透明像素下面也要先画背景
+            painter.fillRect(event.rect(), background)
+        elif target != event.rect():
+            for rect in (QRegion(event.rect()) - QRegion(image_rect)).rects():
+                painter.fillRect(rect, background)
+        if target.isEmpty():
+            return
+        if self._scale == 1.0:
+            painter.drawPixmap(target, self._pixmap, target.translated(-offset))
+        else:
+            # 只取重绘区域对应的源像素块（多取 1 像素供插值）缩放绘制，
+            # 工作量与可见区域成正比，与图片尺寸和缩放比例无关
+            s = self._scale
+            local = QRectF(target.translated(-offset))
+            source = QRectF(local.x() / s, local.y() / s, local.width() / s, local.height() / s)
+            source = QRectF(source.toAlignedRect().adjusted(-1, -1, 1, 1).intersected(self._pixmap.rect()))
+            dest = QRectF(offset.x() + source.x() * s, offset.y() + source.y() * s,
+                          source.width() * s, source.height() * s)
+            painter.setClipRect(target)
+            painter.setRenderHint(QPainter.SmoothPixmapTransform, self._smooth)
+            painter.drawPixmap(dest, self._pixmap, source)
+        painter.end()
+
+class _CoalescedMoveMixin:
+    """拖动时合并移动请求：只记录最新的目标位置，每帧（约16ms）最多 move 一次
+
+    触摸屏的移动事件频率可能远高于刷新率，每个事件都 move 会反复触发重新布局和重绘。
+    """
+    def init_coalesced_move(self):
+        self._pending_move = None
+        self._move_timer = QTimer(self)
+        self._move_timer.setSingleShot(True)
+        self._move_timer.setInterval(16)
+        self._move_timer.timeout.connect(self.flush_move)
+
+    def schedule_move(self, pos):
+        self._pending_move = pos
+        if not self._move_timer.isActive():
+            self._move_timer.start()
+
+    def flush_move(self):
+        """立即执行尚未执行的移动（松开鼠标、保存位置前调用）"""
+        self._move_timer.stop()
+        if self._pending_move is not None:
+            self.move(self._pending_move)
+            self._pending_move = None
+
+# 触屏按钮的共用样式：按钮通过 role 属性（undo/delete/move/prev/next）选择颜色
+TOUCH_BUTTON_STYLE = """
+    QPushButton {
+        color: white;
+        border: 4px solid white;
+        border-radius: 60px;
+        font-size: 18px;
+        font-weight: bold;
+        padding: 10px;
+    }
+    QPushButton:hover {
+        border: 5px solid white;
+    }
+    QPushButton:pressed {
+        border: 4px solid rgba(255, 255, 255, 180);
+    }
+    QPushButton[role="undo"] { border-radius: 30px; }
+    QPushButton[role="prev"], QPushButton[role="next"] { font-size: 16px; }
+
+    QPushButton[role="undo"] { background-color: rgba(255, 149, 0, 220); }
+    QPushButton[role="undo"]:hover { background-color: rgba(255, 149, 0, 255); }
+    QPushButton[role="undo"]:pressed { background-color: rgba(220, 120, 0, 255); }
+
+    QPushButton[role="delete"] { background-color: rgba(255, 59, 48, 220); }
+    QPushButton[role="delete"]:hover { background-color: rgba(255, 59, 48, 255); }
+    QPushButton[role="delete"]:pressed { background-color: rgba(200, 40, 30, 255); }
+
+    QPushButton[role="move"] { background-color: rgba(52, 199, 89, 220); }
+    QPushButton[role="move"]:hover { background-color: rgba(52, 199, 89, 255); }
+    QPushButton[role="move"]:pressed { background-color: rgba(40, 160, 70, 255); }
+
+    QPushButton[role="prev"], QPushButton[role="next"] { background-color: rgba(0, 122, 255, 220); }
+    QPushButton[role="prev"]:hover, QPushButton[role="next"]:hover { background-color: rgba(0, 122, 255, 255); }
+    QPushButton[role="prev"]:pressed, QPushButton[role="next"]:pressed { background-color: rgba(0, 100, 220, 255); }
+"""
+
+class DraggableButton(_CoalescedMoveMixin, QPushButton):
     """可拖动的按钮类"""
     def __init__(self, text, parent=None, button_id=None):
         super().__init__(text, parent)
+        self.init_coalesced_move()
         self.dragging = False
         self.drag_position = QPoint()
         self.press_pos = QPoint()
@@ -32,11 +692,12 @@ class DraggableButton(QPushButton):
             # 如果移动距离超过10像素，认为是拖动
             if (event.globalPos() - self.press_pos).manhattanLength() > 10:
                 self.dragging = True
-                self.move(event.globalPos() - self.drag_position)
+                self.schedule_move(event.globalPos() - self.drag_position)
             event.accept()
 
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.LeftButton:
+            self.flush_move()
             was_dragging = self.dragging
             # 如果没有拖动，触发点击事件
             if not self.dragging:
@@ -49,16 +710,17 @@ class DraggableButton(QPushButton):
                     self.parent().save_button_positions()
             event.accept()
 
-class DraggableButtonContainer(QLabel):
+class DraggableButtonContainer(_CoalescedMoveMixin, QLabel):
     """可拖动的按钮容器，用于将多个按钮组合在一起移动"""
     def __init__(self, parent=None, container_id=None):
         super().__init__(parent)
+        self.init_coalesced_move()
         self.dragging = False
         self.drag_position = QPoint()
         self.press_pos = QPoint()
         self.container_id = container_id
         self.has_moved = False  # 新增：标记是否有任何移动
-        self.setStyleSheet("background: transparent;")
+        self.setStyleSheet("* { background: transparent; }")
 
         # 创建手柄区域标签
         self.handle = QLabel(self)
@@ -118,11 +780,12 @@ class DraggableButtonContainer(QLabel):
             # 如果移动距离超过10像素，认为是拖动
             if (event.globalPos() - self.press_pos).manhattanLength() > 10:
                 self.dragging = True
-                self.move(event.globalPos() - self.drag_position)
+                self.schedule_move(event.globalPos() - self.drag_position)
             event.accept()
 
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.LeftButton:
+            self.flush_move()
             was_dragging = self.dragging
 
             # 如果有任何移动，阻止点击事件传递给子按钮
@@ -151,10 +814,109 @@ def resource_path(relative_path):
 
     return os.path.join(base_path, relative_path)
 
+@functools.lru_cache(maxsize=1)
+def app_icon():
+    """应用图标（首次调用时加载，之后所有窗口共用同一个 QIcon）；图标文件不存在时返回 None
+
+    需要在创建 QApplication 之后调用。
+    """
+    icon_path = resource_path('1024x1024.png')
+    return QIcon(icon_path) if os.path.exists(icon_path) else None
+
+def _box_blur_axis(arr, size, axis):
+    """沿单个轴做滑动均值（前缀和实现，边缘镜像填充）"""
+    if size <= 1 or arr.shape[axis] < 2:
+        return arr
+    before = size // 2
+    pad = [(0, 0)] * arr.ndim
+    pad[axis] = (before, size - 1 - before)
+    padded = np.pad(arr, pad, mode='symmetric')
+    # 直接沿 axis 累加和切片，不再 moveaxis：结果保持 C 连续，横向一遍也不必按转置后的步长访问内存
+    csum = np.cumsum(padded, axis=axis, dtype=np.uint32)
+
+    def along(start, stop):
+        index = [slice(None)] * arr.ndim
+        index[axis] = slice(start, stop)
+        return tuple(index)
+
+    sums = csum[along(size - 1, None)].copy()
+    sums[along(1, None)] -= csum[along(None, padded.shape[axis] - size)]
+    return ((sums + size // 2) // size).astype(np.uint8)
+
+@functools.lru_cache(maxsize=8)
+def _disc_mask(width):
+    """直径为 width 的圆形笔刷掩码，以 (r, r) 为圆心，r = floor(width / 2)；按笔刷大小缓存"""
+    radius = width / 2
+    r = int(radius)
+    ys, xs = np.ogrid[-r:r + 1, -r:r + 1]
+    mask = xs * xs + ys * ys <= radius * radius
+    mask.flags.writeable = False
+    return mask
+
+def draw_thick_line(arr, x0, y0, x1, y1, width, color):
+    """在 (h, w, 4) 的 uint8 数组上直接光栅化一条带圆头的粗线段
+
+    只计算线段包围盒内每个像素到线段的距离，距离不超过 width/2 的像素填充为 color。
+    起点与终点重合（单击或鼠标未移动）时直接盖上预先计算的圆形笔刷掩码。
+    """
+    radius = width / 2
+    height, img_width = arr.shape[:2]
+    if x0 == x1 and y0 == y1 and isinstance(x0, int) and isinstance(y0, int):
+        mask = _disc_mask(width)
+        r = mask.shape[0] // 2
+        left, top = max(0, x0 - r), max(0, y0 - r)
+        right, bottom = min(img_width, x0 + r + 1), min(height, y0 + r + 1)
+        if right > left and bottom > top:
+            mask = mask[top - (y0 - r):bottom - (y0 - r), left - (x0 - r):right - (x0 - r)]
+            arr[top:bottom, left:right][mask] = color
+        return
+    left = max(0, int(min(x0, x1) - radius))
+    top = max(0, int(min(y0, y1) - radius))
+    right = min(img_width, int(max(x0, x1) + radius) + 1)
+    bottom = min(height, int(max(y0, y1) + radius) + 1)
+    if right <= left or bottom <= top:
+        return
+
+    dx, dy = x1 - x0, y1 - y0
+    if abs(dx) <= width or abs(dy) <= width:
+        _fill_segment(arr, left, top, right, bottom, x0, y0, dx, dy, radius, color)
+        return
+    # 较长的斜线段包围盒远大于线段覆盖的面积：按横条分别处理（条高不小于 16，避免细线时循环过多），
+    # 每条只计算线段在该条附近经过的那一段 x 范围（结果与整块计算完全相同）
+    band = max(width, 16)
+    for band_top in range(top, bottom, band):
+        band_bottom = min(bottom, band_top + band)
+        ta = min(1.0, max(0.0, (band_top - radius - y0) / dy))
+        tb = min(1.0, max(0.0, (band_bottom + radius - y0) / dy))
+        xa, xb = x0 + ta * dx, x0 + tb * dx
+        band_left = max(left, int(min(xa, xb) - radius))
+        band_right = min(right, int(max(xa, xb) + radius) + 1)
+        if band_right > band_left:
+            _fill_segment(arr, band_left, band_top, band_right, band_bottom, x0, y0, dx, dy, radius, color)
+
+def _fill_segment(arr, left, top, right, bottom, x0, y0, dx, dy, radius, color):
+    """把 arr[top:bottom, left:right] 中到线段 (x0, y0)-(x0+dx, y0+dy) 距离不超过 radius 的像素填充为 color"""
+    ys, xs = np.ogrid[top:bottom, left:right]
+    length2 = dx * dx + dy * dy
+    if length2 == 0:
+        t = 0.0
+    else:
+        # 像素在线段上的投影参数，限制在 [0, 1] 内即得到圆头
+        t = np.clip(((xs - x0) * dx + (ys - y0) * dy) / length2, 0.0, 1.0)
+    px = x0 + t * dx - xs
+    py = y0 + t * dy - ys
+    mask = px * px + py * py <= radius * radius
+    arr[top:bottom, left:right][mask] = color
+
+def box_blur(arr, size):
+    """对 (h, w, c) 的 uint8 数组做可分离的均值模糊，先纵向再横向"""
+    return _box_blur_axis(_box_blur_axis(arr, size, 0), size, 1)
+
 class ImageViewer(QMainWindow):
     def __init__(self, image_path=None):
         super().__init__()
         self.last_save_path = ''  # 添加变量记录上次保存路径
+        self._last_error_notice = None  # 上次显示错误通知的时间（time.monotonic）
         self.initUI()
         if image_path:
             self.load_image(image_path)
@@ -166,12 +928,11 @@ class ImageViewer(QMainWindow):
             self.setGeometry(100, 100, 800, 600)
 
             # 设置应用图标
-            icon_path = resource_path('1024x1024.png')
-            if os.path.exists(icon_path):
-                app_icon = QIcon(icon_path)
-                self.setWindowIcon(app_icon)
+            icon = app_icon()
+            if icon is not None:
+                self.setWindowIcon(icon)
                 # 确保应用程序级别的图标也被设置
-                QApplication.setWindowIcon(app_icon)
+                QApplication.setWindowIcon(icon)
             
             # 创建滚动区域
             self.scroll_area = QScrollArea(self)
@@ -179,9 +940,11 @@ class ImageViewer(QMainWindow):
             self.setCentralWidget(self.scroll_area)
 
             # 创建标签用于显示图片
-            self.image_label = QLabel()
-            self.image_label.setAlignment(Qt.AlignCenter)
+            self.image_label = ImageCanvas()
             self.scroll_area.setWidget(self.image_label)
+            self.image_label.installEventFilter(self)
+            # 标签坐标 -> 图像坐标的变换（见 update_image_transform），显示或标签大小变化时重新计算
+            self._image_transform = None
 
             # 设置焦点策略，确保窗口能接收键盘事件
             self.setFocusPolicy(Qt.StrongFocus)
@@ -191,16 +954,30 @@ class ImageViewer(QMainWindow):
 
             # 初始化变量
             self.image = None
+            self._np = None  # 当前图像的 RGBA 像素缓冲区（H×W×4 uint8），self.image 与 self._qimage 共享它
+            self._qimage = None
+            self._opaque = True  # 当前图像是否完全不透明
             self.drawing = False
             self.last_point = None
             self.brush_size = 20
             self.current_tool = 'draw'  # 'draw', 'blur', 或 'arrow'
-            self.brush_color = QColor(255, 0, 0)  # 默认红色 (RGB: 255, 0, 0)
+            self.set_brush_color(QColor(255, 0, 0))  # 默认红色 (RGB: 255, 0, 0)
             self.pixmap = None
+            self._scaled_pixmap = None  # 缩小显示时控件引用的较小 pixmap（mip 或预先缩小的图）；否则为 None
+            self._mips = []  # self.pixmap 逐级缩小一半的 pixmap（mipmap），缩小显示时从中选取缩放源
+            self._mips_stale = True  # self.pixmap 改变后 mipmap 需要在下次缩放时重建
+            # 平滑缩小的结果缓存在 QPixmapCache 中（由 Qt 按容量淘汰），键包含 mipmap 的版本号，
+            # self.pixmap 修改后旧结果不会再被取到；_zoom_keys 记录当前版本的键，重建时一并移除
+            QPixmapCache.setCacheLimit(max(QPixmapCache.cacheLimit(), PIXMAP_CACHE_LIMIT_KB))
+            self._zoom_generation = 0
+            self._zoom_keys = []
+            self._prescaled = False  # 控件显示的是否为预先平滑缩小的 pixmap（而不是视图变换）
+            self._unsmoothed_rect = QRect()  # 缩小显示时只做了快速缩放、尚待平滑的区域（图像坐标）
             self.arrow_start_point = None  # 箭头起点
             self.arrow_end_point = None  # 箭头终点
             self.arrow_width = 5  # 箭头线条宽度
             self.temp_arrow_layer = None  # 临时箭头图层用于预览
+            self._arrow_rect = QRect()  # 当前预览箭头覆盖的区域
             self.scale_factor = 1.0  # 添加缩放因子
             self.min_scale = 0.1  # 最小缩放比例
             self.max_scale = 5.0  # 最大缩放比例
@@ -208,6 +985,64 @@ class ImageViewer(QMainWindow):
             self.last_pan_pos = None  # 添加上一次平移位置
             self.grabGesture(Qt.PinchGesture)
             self._pinch_start_scale_factor = 1.0
+            self._pinch_bars = None  # 手势开始时取得的 (水平, 垂直) 滚动条，更新时直接复用
+            self._pinch_center = None  # 上一次手势中心的 (屏幕坐标, 视口坐标)，中心未移动时不再转换
+
+            # 绘制时合并重绘请求，每帧（约16ms）最多刷新一次显示
+            self._dirty_rect = QRect()  # 待刷新的图像区域（图像坐标）
+            self._repaint_timer = QTimer(self)
+            self._repaint_timer.setSingleShot(True)
+            self._repaint_timer.setInterval(16)
+            self._repaint_timer.timeout.connect(self._do_display)
+            # 拖动笔刷时先记录鼠标位置（图像标签坐标），每帧（约16ms）集中处理一次
+            self._pending_points = []
+            self._stroke_timer = QTimer(self)
+            self._stroke_timer.setSingleShot(True)
+            self._stroke_timer.setInterval(16)
+            self._stroke_timer.timeout.connect(self.flush_stroke_points)
+            # 手势缩放同样合并到每帧最多一次：(缩放因子, 水平滚动位置, 垂直滚动位置)
+            self._pending_zoom = None
+            self._zoom_timer = QTimer(self)
+            self._zoom_timer.setSingleShot(True)
+            self._zoom_timer.setInterval(16)
+            self._zoom_timer.timeout.connect(self._flush_zoom)
+            # 触控板的滚轮事件和拖动平移的频率很高，累积滚动量后每帧只滚动一次
+            self._scroll_delta = QPointF()  # 触摸平移的增量可能是小数，累积后再取整
+            self._scroll_timer = QTimer(self)
+            self._scroll_timer.setSingleShot(True)
+            self._scroll_timer.setInterval(16)
+            self._scroll_timer.timeout.connect(self._flush_scroll)
+            self._resmooth_timer = QTimer(self)
+            self._resmooth_timer.setSingleShot(True)
+            self._resmooth_timer.setInterval(80)
+            self._resmooth_timer.timeout.connect(self._resmooth)
+
+            # 已解码图片的 LRU 缓存：{路径: (文件修改时间, RGBA 像素数组)}；
+            # 图片在后台线程中解码（加载当前图片并预读前后相邻的图片）
+            self._image_cache = OrderedDict()
+            self._image_cache_bytes = 0
+            self._browse_direction = 1  # 最近一次切换图片的方向：1 为下一张，-1 为上一张
+            self._prefetching = set()  # 正在后台解码的路径
+            self._loading_path = None  # 等待解码完成后显示的图片路径
+            self._showing_preview = False  # 标签上显示的是加载中图片的预览，而不是当前图像
+            self._loaded_mtime = None  # 当前图片解码时的文件修改时间
+            self._pixel_version = 0  # 像素每次改变（换图、笔画、撤销、重做）时加一
+            self._saved_state = None  # 最近一次保存成功的 (规范化路径, 像素版本, 文件修改时间)
+            self._pending_save = None  # 正在后台保存的 (规范化路径, 像素版本)
+            self._decode_pool = QThreadPool(self)
+            self._decode_pool.setMaxThreadCount(2)
+            self._decode_signals = _DecodeSignals(self)
+            self._decode_signals.loaded.connect(self._on_image_decoded)
+            self._decode_signals.preview.connect(self._on_preview_decoded)
+
+            # 保存和删除文件（备份 + 移到回收站）在单线程的线程池中按顺序执行，不阻塞界面
+            self._file_pool = QThreadPool(self)
+            self._file_pool.setMaxThreadCount(1)
+            self._delete_signals = _DeleteSignals(self)
+            self._delete_signals.finished.connect(self._on_delete_finished)
+            self._save_signals = _SaveSignals(self)
+            self._save_signals.finished.connect(self._on_save_finished)
+            self._pending_deletes = set()  # 正在后台删除的路径
 
             # 触摸滑动相关变量
             self.touch_start_pos = None  # 触摸开始位置
@@ -216,7 +1051,6 @@ class ImageViewer(QMainWindow):
             self.is_touch_panning = False  # 是否正在进行触摸平移
             self.swipe_threshold = 80  # 滑动切换阈值（像素）
             self.is_in_touch_mode = False  # 是否处于触摸模式
-            self.touch_point_count = 0  # 当前触摸点数量
             self.is_pinching = False  # 是否正在进行双指缩放
             self.touch_buttons_visible = False  # 触屏按钮是否可见
 
@@ -226,9 +1060,13 @@ class ImageViewer(QMainWindow):
             # 创建菜单栏
             self.create_menus()
             
-            # 初始化历史记录
-            self.history = []
-            self.current_step = -1
+            # 初始化历史记录（每条记录只保存一次笔画所覆盖区域的原始像素）
+            self.history = deque(maxlen=MAX_HISTORY)
+            self.redo_stack = deque(maxlen=MAX_HISTORY)
+            self._pre_stroke = None  # 笔画开始前的像素快照（_StrokeSnapshot），笔画结束后释放
+            self._stroke_rect = QRect()  # 当前笔画累计修改的区域
+            self._blur_tiles = {}  # 笔画开始前图像的模糊结果分块缓存：{(块x, 块y): 像素}
+            self._blur_tiles_size = None  # 缓存对应的模糊核大小
 
             # 创建通知标签
             self.notification_label = QLabel(self)
@@ -244,6 +1082,10 @@ class ImageViewer(QMainWindow):
             """)
             self.notification_label.setAlignment(Qt.AlignCenter)
             self.notification_label.hide()
+            # 通知的自动隐藏共用一个定时器，连续通知时重新计时，不会被之前的通知提前隐藏
+            self._notification_timer = QTimer(self)
+            self._notification_timer.setSingleShot(True)
+            self._notification_timer.timeout.connect(self.notification_label.hide)
 
             # 初始化当前图片路径
             self.current_image_path = None
@@ -253,8 +1095,30 @@ class ImageViewer(QMainWindow):
 
             # 当前目录的图片列表和索引
             self.image_list = []
+            self._image_index = {}  # image_list 的 {路径: 索引} 查找表
             self.current_image_index = -1
 
+            # 目录扫描缓存：{目录: (目录修改时间, 已排序的图片路径列表, {路径: 索引})}
+            self._dir_cache = {}
+            # 缓存失效的目录在后台重新扫描，扫描期间继续使用旧的列表
+            self._list_pool = QThreadPool(self)
+            self._list_pool.setMaxThreadCount(1)
+            self._list_signals = _ListSignals(self)
+            self._list_signals.listed.connect(self._on_directory_listed)
+            self._scanning_dirs = set()
+            self._rescan_dirs = set()  # 扫描期间又收到变化通知、扫描结束后需要重新扫描的目录
+            # 已缓存的目录由 QFileSystemWatcher 监视，没有变化通知时切换图片不必再 stat 目录
+            self._dir_watcher = QFileSystemWatcher(self)
+            self._dir_watcher.directoryChanged.connect(self._on_directory_changed)
+            self._watched_dirs = set()
+
+            # 配置文件内容缓存在内存中；拖动按钮后延迟 500ms 写入，连续调整位置只写一次
+            self._config = None
+            self._config_save_timer = QTimer(self)
+            self._config_save_timer.setSingleShot(True)
+            self._config_save_timer.setInterval(500)
+            self._config_save_timer.timeout.connect(self.write_config)
+
             # 创建触屏操作按钮
             self.create_touch_buttons()
 
@@ -295,130 +1159,26 @@ class ImageViewer(QMainWindow):
             self.all_buttons_container.handle.setFixedWidth(260)
             self.all_buttons_container.handle.move(0, 0)
 
-            # 创建撤销按钮（手柄下方）
-            self.undo_button = QPushButton("↶\n撤销", self.all_buttons_container)
-            self.undo_button.setFixedSize(260, 60)
-            self.undo_button.setStyleSheet("""
-                QPushButton {
-                    background-color: rgba(255, 149, 0, 220);
-                    color: white;
-                    border: 4px solid white;
-                    border-radius: 30px;
-                    font-size: 18px;
-                    font-weight: bold;
-                    padding: 10px;
-                }
-                QPushButton:hover {
-                    background-color: rgba(255, 149, 0, 255);
-                    border: 5px solid white;
-                }
-                QPushButton:pressed {
-                    background-color: rgba(220, 120, 0, 255);
-                    border: 4px solid rgba(255, 255, 255, 180);
-                }
-            """)
-            self.undo_button.clicked.connect(self.handle_undo)
-            self.undo_button.move(0, 30)  # 手柄下方
-
-            # 创建删除按钮（不再单独可拖动）
-            self.delete_button = QPushButton("🗑️\n删除", self.all_buttons_container)
-            self.delete_button.setFixedSize(120, 120)
-            self.delete_button.setStyleSheet("""
-                QPushButton {
-                    background-color: rgba(255, 59, 48, 220);
-                    color: white;
-                    border: 4px solid white;
-                    border-radius: 60px;
-                    font-size: 18px;
-                    font-weight: bold;
-                    padding: 10px;
-                }
-                QPushButton:hover {
-                    background-color: rgba(255, 59, 48, 255);
-                    border: 5px solid white;
-                }
-                QPushButton:pressed {
-                    background-color: rgba(200, 40, 30, 255);
-                    border: 4px solid rgba(255, 255, 255, 180);
-                }
-            """)
-            self.delete_button.clicked.connect(self.delete_current_image)
-            self.delete_button.move(0, 110)  # 左侧，撤销按钮下方
-
-            # 创建移动到上层目录按钮（不再单独可拖动）
-            self.move_button = QPushButton("📤\n上层", self.all_buttons_container)
-            self.move_button.setFixedSize(120, 120)
-            self.move_button.setStyleSheet("""
-                QPushButton {
-                    background-color: rgba(52, 199, 89, 220);
-                    color: white;
-                    border: 4px solid white;
-                    border-radius: 60px;
-                    font-size: 18px;
-                    font-weight: bold;
-                    padding: 10px;
-                }
-                QPushButton:hover {
-                    background-color: rgba(52, 199, 89, 255);
-                    border: 5px solid white;
-                }
-                QPushButton:pressed {
-                    background-color: rgba(40, 160, 70, 255);
-                    border: 4px solid rgba(255, 255, 255, 180);
-                }
-            """)
-            self.move_button.clicked.connect(self.copy_to_parent_directory)
-            self.move_button.move(140, 110)  # 右侧，撤销按钮下方
-
-            # 创建上一张按钮（不再单独可拖动）
-            self.prev_button = QPushButton("◀\n上一张", self.all_buttons_container)
-            self.prev_button.setFixedSize(120, 120)
-            self.prev_button.setStyleSheet("""
-                QPushButton {
-                    background-color: rgba(0, 122, 255, 220);
-                    color: white;
-                    border: 4px solid white;
-                    border-radius: 60px;
-                    font-size: 16px;
-                    font-weight: bold;
-                    padding: 10px;
-                }
-                QPushButton:hover {
-                    background-color: rgba(0, 122, 255, 255);
-                    border: 5px solid white;
-                }
-                QPushButton:pressed {
-                    background-color: rgba(0, 100, 220, 255);
-                    border: 4px solid rgba(255, 255, 255, 180);
-                }
-            """)
-            self.prev_button.clicked.connect(self.show_previous_image)
-            self.prev_button.move(0, 250)  # 左下角
-
-            # 创建下一张按钮（不再单独可拖动）
-            self.next_button = QPushButton("▶\n下一张", self.all_buttons_container)
-            self.next_button.setFixedSize(120, 120)
-            self.next_button.setStyleSheet("""
-                QPushButton {
-                    background-color: rgba(0, 122, 255, 220);
-                    color: white;
-                    border: 4px solid white;
-                    border-radius: 60px;
-                    font-size: 16px;
-                    font-weight: bold;
-                    padding: 10px;
-                }
-                QPushButton:hover {
-                    background-color: rgba(0, 122, 255, 255);
-                    border: 5px solid white;
-                }
-                QPushButton:pressed {
-                    background-color: rgba(0, 100, 220, 255);
-                    border: 4px solid rgba(255, 255, 255, 180);
-                }
-            """)
-            self.next_button.clicked.connect(self.show_next_image)
-            self.next_button.move(140, 250)  # 右下角
+            # 按钮配置：(role, 文字, 大小, 位置, 点击处理函数)
+            # 按钮保存为 self.<role>_button，role 属性同时用于样式表区分颜色
+            buttons = [
+                ("undo", "↶\n撤销", (260, 60), (0, 30), self.handle_undo),  # 手柄下方
+                ("delete", "🗑️\n删除", (120, 120), (0, 110), self.delete_current_image),  # 左侧，撤销按钮下方
+                ("move", "📤\n上层", (120, 120), (140, 110), self.copy_to_parent_directory),  # 右侧，撤销按钮下方
+                ("prev", "◀\n上一张", (120, 120), (0, 250), self.show_previous_image),  # 左下角
+                ("next", "▶\n下一张", (120, 120), (140, 250), self.show_next_image),  # 右下角
+            ]
+            for role, text, size, pos, handler in buttons:
+                button = QPushButton(text, self.all_buttons_container)
+                button.setFixedSize(*size)
+                button.setProperty("role", role)
+                button.clicked.connect(handler)
+                button.move(*pos)
+                setattr(self, f"{role}_button", button)
+
+            # 所有按钮共用容器上的一份样式表，按 role 属性区分颜色
+            self.all_buttons_container.setStyleSheet(
+                self.all_buttons_container.styleSheet() + TOUCH_BUTTON_STYLE)
 
             self.all_buttons_container.hide()
 
@@ -435,24 +1195,37 @@ class ImageViewer(QMainWindow):
         config_file = os.path.join(config_dir, ".image_viewer_config.json")
         return config_file
 
-    def load_button_positions(self):
-        """从配置文件加载按钮位置"""
-        try:
+    def read_config(self):
+        """返回配置内容（首次调用时从配置文件读取，之后使用内存中的缓存）"""
+        if self._config is None:
+            self._config = {}
             config_file = self.get_config_file_path()
             if os.path.exists(config_file):
                 with open(config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    button_positions = config.get('button_positions', {})
+                    self._config = json.load(f)
+        return self._config
 
-                    # 加载统一按钮容器位置
-                    if 'all_buttons' in button_positions:
-                        pos = button_positions['all_buttons']
-                        self.all_buttons_container.move(pos['x'], pos['y'])
-                    else:
-                        # 使用默认位置（右下角）
-                        self.all_buttons_container.move(self.width() - 280, self.height() - 390)
+    def write_config(self):
+        """把内存中的配置写入配置文件"""
+        self._config_save_timer.stop()
+        try:
+            with open(self.get_config_file_path(), 'w', encoding='utf-8') as f:
+                json.dump(self.read_config(), f, indent=2, ensure_ascii=False)
+            print(f'按钮位置已保存')
+        except Exception as e:
+            print(f'保存按钮位置失败: {str(e)}')
+
+    def load_button_positions(self):
+        """从配置文件加载按钮位置"""
+        try:
+            button_positions = self.read_config().get('button_positions', {})
+
+            # 加载统一按钮容器位置
+            if 'all_buttons' in button_positions:
+                pos = button_positions['all_buttons']
+                self.all_buttons_container.move(pos['x'], pos['y'])
             else:
-                # 配置文件不存在，使用默认位置
+                # 配置文件或其中的位置不存在，使用默认位置（右下角）
                 self.all_buttons_container.move(self.width() - 280, self.height() - 390)
         except Exception as e:
             print(f'加载按钮位置失败: {str(e)}')
@@ -460,15 +1233,9 @@ class ImageViewer(QMainWindow):
             self.all_buttons_container.move(self.width() - 280, self.height() - 390)
 
     def save_button_positions(self):
-        """保存按钮位置到配置文件"""
+        """保存按钮位置：先更新内存中的配置，停止拖动 500ms 后再写入配置文件"""
         try:
-            config_file = self.get_config_file_path()
-
-            # 读取现有配置或创建新配置
-            config = {}
-            if os.path.exists(config_file):
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
+            config = self.read_config()
 
             # 保存统一按钮容器位置
             button_positions = {}
@@ -478,12 +1245,7 @@ class ImageViewer(QMainWindow):
             }
 
             config['button_positions'] = button_positions
-
-            # 写入配置文件
-            with open(config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
-
-            print(f'按钮位置已保存')
+            self._config_save_timer.start()
         except Exception as e:
             print(f'保存按钮位置失败: {str(e)}')
 
@@ -548,6 +1310,11 @@ class ImageViewer(QMainWindow):
         undo_action.triggered.connect(self.handle_undo)
         edit_menu.addAction(undo_action)
 
+        redo_action = QAction('重做(&Y)', self)
+        redo_action.setShortcut('Ctrl+Y')
+        redo_action.triggered.connect(self.redo)
+        edit_menu.addAction(redo_action)
+
         # 工具菜单
         tool_menu = menubar.addMenu('工具(&T)')
 
@@ -595,14 +1362,22 @@ class ImageViewer(QMainWindow):
 
     def handle_undo(self):
         """统一处理撤销操作"""
-        print(f"Debug: handle_undo called, last_deleted_file = {self.last_deleted_file}")
-        if self.last_deleted_file:
-            print("Debug: Calling undo_delete()")
+        logger.debug("handle_undo called, last_deleted_file = %s", self.last_deleted_file)
+        if self.last_deleted_file or self._pending_deletes:
+            logger.debug("Calling undo_delete()")
             self.undo_delete()
         else:
-            print("Debug: Calling undo()")
+            logger.debug("Calling undo()")
             self.undo()
 
+    def notify_error(self, error):
+        """高频处理函数出错时提示用户（详情已写入日志）；ERROR_NOTICE_INTERVAL 内最多提示一次"""
+        now = time.monotonic()
+        if self._last_error_notice is not None and now - self._last_error_notice < ERROR_NOTICE_INTERVAL:
+            return
+        self._last_error_notice = now
+        self.show_notification(f"操作出错: {str(error) or type(error).__name__}")
+
     def show_notification(self, message, duration=1500):
         """显示一个临时通知，自动消失"""
         self.notification_label.setText(message)
@@ -619,140 +1394,121 @@ class ImageViewer(QMainWindow):
         self.notification_label.show()
         self.notification_label.raise_()
 
-        # 设置定时器自动隐藏
-        QTimer.singleShot(duration, self.notification_label.hide)
+        # 重新开始自动隐藏的计时
+        self._notification_timer.start(duration)
 
-    def delete_current_image(self):
-        """删除当前显示的图片文件（移动到回收站）"""
+    def delete_current_image(self, copy_to=''):
+        """删除当前显示的图片文件（移动到回收站）
+
+        copy_to 不为空时先在后台把文件复制到该路径，复制成功后才删除。
+        """
         try:
             if not self.current_image_path:
                 self.show_notification("没有可删除的图片")
                 return
 
-            # 先更新图片列表，确保列表是最新的
-            self.update_image_list()
+            # 先更新图片列表，确保列表是最新的（删除后要据此选择下一张，因此同步扫描）
+            self.update_image_list(blocking=True)
 
             if not os.path.exists(self.current_image_path):
                 self.show_notification("图片文件不存在")
                 return
 
             # 记录删除的文件路径和索引
-            deleted_path = self.current_image_path
+            deleted_path = os.path.normpath(os.path.abspath(self.current_image_path))
             filename = os.path.basename(deleted_path)
+            if deleted_path in self._pending_deletes:
+                return
 
-            # 记录当前图片在列表中的索引（删除前）
-            if deleted_path in self.image_list:
-                deleted_index = self.image_list.index(deleted_path)
+            # 撤销时优先从回收站恢复；只有当前平台不支持恢复时才创建临时备份文件
+            if can_restore_from_trash():
+                backup_path = ''
+            else:
+                import tempfile
+                temp_dir = tempfile.gettempdir()
+                backup_path = os.path.join(temp_dir, f"image_backup_{filename}")
+
+            # 备份和移到回收站都在后台线程完成，结果由 _on_delete_finished 处理；
+            # 这里先把文件从列表中去掉并切换到下一张，界面不必等待磁盘操作
+            self._pending_deletes.add(deleted_path)
+            self._file_pool.start(_DeleteTask(deleted_path, backup_path, self._delete_signals, copy_to))
+
+            # 记录当前图片在列表中的索引（删除前），并从列表中移除
+            if deleted_path in self._image_index:
+                deleted_index = self._image_index[deleted_path]
+                self.image_list = self.image_list[:deleted_index] + self.image_list[deleted_index + 1:]
+                self._image_index = {path: i for i, path in enumerate(self.image_list)}
             else:
                 deleted_index = self.current_image_index
 
-            # 创建临时备份文件（用于撤销）
-            import tempfile
-            import shutil
-            import time
-            temp_dir = tempfile.gettempdir()
-            backup_path = os.path.join(temp_dir, f"image_backup_{filename}")
-
-            # 备份文件
-            shutil.copy2(deleted_path, backup_path)
-
-            # 使用 send2trash 库移动到回收站（无确认框）
-            try:
-                from send2trash import send2trash
-                send2trash(deleted_path)
-                success = True
-            except ImportError:
-                # 如果没有 send2trash 库，使用 win32api
-                import win32api
-                import win32con
-                # FOF_ALLOWUNDO: 允许撤销（移到回收站）
-                # FOF_NOCONFIRMATION: 不显示确认对话框
-                # FOF_SILENT: 静默操作
-                result = win32api.SHFileOperation((
-                    0,  # hwnd
-                    win32con.FO_DELETE,  # 操作类型：删除
-                    deleted_path,  # 源文件
-                    None,  # 目标（删除操作不需要）
-                    win32con.FOF_ALLOWUNDO | win32con.FOF_NOCONFIRMATION | win32con.FOF_SILENT,  # 标志
-                    None,  # 进度标题
-                    None   # 进度文本
-                ))
-                success = (result == 0)
-
-            if success:
-
-                # 记录最后删除的文件，用于撤销
-                self.last_deleted_file = {
-                    'path': deleted_path,
-                    'filename': filename,
-                    'directory': os.path.dirname(deleted_path),
-                    'backup_path': backup_path
-                }
-
-                print(f"Debug: File deleted, last_deleted_file set to: {self.last_deleted_file}")
-
-                # 等待文件系统完成删除操作
-                time.sleep(0.2)
-
-                # 重新扫描目录获取最新的图片列表
-                directory = os.path.dirname(deleted_path)
-                image_extensions = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.webp')
-                all_files = []
-                for file in os.listdir(directory):
-                    if file.lower().endswith(image_extensions):
-                        full_path = os.path.normpath(os.path.join(directory, file))
-                        # 确保文件真实存在且可访问
-                        if os.path.exists(full_path) and os.path.isfile(full_path):
-                            all_files.append(full_path)
-                all_files.sort()
-                self.image_list = all_files
-
-                # 根据删除前的索引，加载下一张图片
-                if self.image_list:
-                    # 如果删除的是最后一张，则显示新的最后一张
-                    if deleted_index >= len(self.image_list):
-                        self.current_image_index = len(self.image_list) - 1
-                    else:
-                        # 否则显示相同索引位置的图片（原来的下一张）
-                        self.current_image_index = deleted_index
-
-                    # 加载图片
-                    next_image_path = self.image_list[self.current_image_index]
+            # 根据删除前的索引，加载下一张图片
+            if self.image_list:
+                # 如果删除的是最后一张，则显示新的最后一张
+                if deleted_index >= len(self.image_list):
+                    self.current_image_index = len(self.image_list) - 1
+                else:
+                    # 否则显示相同索引位置的图片（原来的下一张）
+                    self.current_image_index = deleted_index
 
-                    # 直接加载图片，不调用 load_image 以避免再次更新列表
-                    self.image = Image.open(next_image_path)
-                    self.current_image_path = next_image_path
-                    self.last_save_path = next_image_path
-                    self.add_to_history()
-                    self.display_image()
+                # 加载图片
+                next_image_path = self.image_list[self.current_image_index]
 
-                    # 更新窗口标题
-                    next_filename = os.path.basename(next_image_path)
-                    self.update_window_title()
+                # 通常已被预读到缓存中；正在后台删除的文件不会出现在重新获取的列表里
+                self.load_image(next_image_path)
+                next_filename = os.path.basename(next_image_path)
 
-                    # 显示通知
-                    self.show_notification(f"已删除 {filename}，切换到: {next_filename} ({self.current_image_index + 1}/{len(self.image_list)})")
-                else:
-                    # 如果没有图片了，清空显示
-                    self.image = None
-                    self.current_image_path = None
-                    self.image_label.clear()
-                    self.current_image_index = -1
-                    self.show_notification(f"已删除: {filename} (Ctrl+Z 可撤销)")
+                # 显示通知
+                self.show_notification(f"已删除 {filename}，切换到: {next_filename} ({self.current_image_index + 1}/{len(self.image_list)})")
             else:
-                self.show_notification("无法访问该文件")
-                # 删除失败，清理备份文件
-                if os.path.exists(backup_path):
-                    os.remove(backup_path)
+                # 如果没有图片了，清空显示
+                self.image = None
+                self.reset_history()
+                self.current_image_path = None
+                self.image_label.clear()
+                self._image_transform = None
+                self.current_image_index = -1
+                self.show_notification(f"已删除: {filename} (Ctrl+Z 可撤销)")
 
         except Exception as e:
             self.show_notification(f"删除失败: {str(e)}")
             print(traceback.format_exc())
 
+    def _on_delete_finished(self, deleted_path, backup_path, copied_path, error):
+        """后台删除完成（GUI 线程）"""
+        self._pending_deletes.discard(deleted_path)
+        self.invalidate_directory_cache(os.path.dirname(deleted_path),
+                                        removed=None if error else deleted_path)
+        if copied_path:
+            self.invalidate_directory_cache(os.path.dirname(copied_path))
+        filename = os.path.basename(deleted_path)
+        if error:
+            self.show_notification(f"删除失败: {filename}: {error}")
+            # 删除失败，清理备份文件，并让文件重新出现在列表中
+            if backup_path and os.path.exists(backup_path) and os.path.exists(deleted_path):
+                os.remove(backup_path)
+            self.update_image_list()
+            return
+
+        # 记录最后删除的文件，用于撤销
+        self.last_deleted_file = {
+            'path': deleted_path,
+            'filename': filename,
+            'directory': os.path.dirname(deleted_path),
+            'backup_path': backup_path
+        }
+        logger.debug("File deleted, last_deleted_file set to: %s", self.last_deleted_file)
+        if copied_path:
+            # 副本的名字在后台创建文件时才确定，这里显示实际使用的名字
+            self.show_notification(f"已复制到上层: {os.path.basename(copied_path)}")
+
     def undo_delete(self):
-        """撤销删除操作（从备份恢复）"""
+        """撤销删除操作（从回收站或备份恢复）"""
         try:
-            print(f"Debug: undo_delete called, last_deleted_file = {self.last_deleted_file}")
+            logger.debug("undo_delete called, last_deleted_file = %s", self.last_deleted_file)
+
+            if self._pending_deletes:
+                self.show_notification("正在删除文件，请稍后再撤销")
+                return
 
             if not self.last_deleted_file:
                 self.show_notification("没有可撤销的删除操作")
@@ -763,21 +1519,22 @@ class ImageViewer(QMainWindow):
             filename = deleted_info['filename']
             backup_path = deleted_info['backup_path']
 
-            print(f"Debug: Attempting to restore from {backup_path} to {deleted_path}")
+            logger.debug("Attempting to restore %s (backup: %s)", deleted_path, backup_path or 'none')
 
-            # 检查备份文件是否存在
-            if not os.path.exists(backup_path):
-                self.show_notification("备份文件不存在，无法恢复")
+            if restore_from_trash(deleted_path):
+                # 从回收站恢复成功，备份（如果有）不再需要
+                if backup_path and os.path.exists(backup_path):
+                    os.remove(backup_path)
+            elif backup_path and os.path.exists(backup_path):
+                # 从备份恢复文件（同一分区时只是重命名，不复制文件内容）
+                import shutil
+                shutil.move(backup_path, deleted_path)
+            else:
+                self.show_notification("无法从回收站恢复，请手动还原")
                 self.last_deleted_file = None
                 return
-
-            # 从备份恢复文件
-            import shutil
-            shutil.copy2(backup_path, deleted_path)
-            print(f"Debug: File restored successfully")
-
-            # 删除备份文件
-            os.remove(backup_path)
+            logger.debug("File restored successfully")
+            self.invalidate_directory_cache(os.path.dirname(deleted_path))
 
             self.show_notification(f"已恢复: {filename}")
 
@@ -791,11 +1548,99 @@ class ImageViewer(QMainWindow):
             self.show_notification(f"撤销失败: {str(e)}")
             print(traceback.format_exc())
 
-    def update_image_list(self):
-        """更新当前目录的图片列表"""
+    def list_directory_images(self, directory, blocking=True):
+        """返回目录中按文件名排序的图片路径列表，以及 {路径: 索引} 查找表
+
+        扫描结果按目录缓存，目录的修改时间不变时直接返回缓存（调用方不要修改返回的对象）。
+        blocking 为 False 时不在 GUI 线程中扫描：缓存失效时先返回旧的列表（没有时返回空列表），
+        同时在后台重新扫描，完成后由 _on_directory_listed 更新图片列表。
+        """
+        directory = os.path.normpath(os.path.abspath(directory))
+        cached = self._dir_cache.get(directory)
+        if cached and cached[0] is not None and directory in self._watched_dirs:
+            return cached[1], cached[2]  # 监视中的目录没有收到变化通知
+        mtime = os.stat(directory).st_mtime
+        if cached and cached[0] == mtime:
+            return cached[1], cached[2]
+
+        if not blocking:
+            if directory not in self._scanning_dirs:
+                self._scanning_dirs.add(directory)
+                self._list_pool.start(_ListTask(directory, self._list_signals))
+            return (cached[1], cached[2]) if cached else ([], {})
+
+        mtime, all_files = scan_directory_images(directory)
+        return self.cache_directory_listing(directory, mtime, all_files)
+
+    def cache_directory_listing(self, directory, mtime, files):
+        """保存目录扫描结果，返回 (图片路径列表, {路径: 索引})"""
+        index = {path: i for i, path in enumerate(files)}
+        self._dir_cache[directory] = (mtime, files, index)
+        if directory not in self._watched_dirs and self._dir_watcher.addPath(directory):
+            self._watched_dirs.add(directory)
+        return files, index
+
+    def _on_directory_changed(self, directory):
+        """被监视的目录内容发生变化（GUI 线程）：让缓存失效，如果是当前目录则在后台重新扫描"""
+        directory = os.path.normpath(directory)
+        if not os.path.isdir(directory):
+            # 目录已被删除或改名，QFileSystemWatcher 会停止监视它
+            self._watched_dirs.discard(directory)
+        self.invalidate_directory_cache(directory)
+        if directory in self._scanning_dirs:
+            self._rescan_dirs.add(directory)
+        elif self.current_image_path and os.path.dirname(
+                os.path.normpath(os.path.abspath(self.current_image_path))) == directory:
+            self.update_image_list()
+
+    def _on_directory_listed(self, directory, mtime, files):
+        """后台目录扫描完成（GUI 线程）：更新缓存，如果是当前目录则刷新图片列表"""
+        self._scanning_dirs.discard(directory)
+        if files is None:
+            return
+        if directory in self._rescan_dirs:
+            # 扫描期间目录又发生了变化，结果可能已经过期：先作为旧列表使用，并重新扫描
+            self._rescan_dirs.discard(directory)
+            self.cache_directory_listing(directory, None, files)
+            self._scanning_dirs.add(directory)
+            self._list_pool.start(_ListTask(directory, self._list_signals))
+            return
+        # 扫描任务在单线程中依次执行，后完成的结果总是更新的
+        self.cache_directory_listing(directory, mtime, files)
+        if self.current_image_path and os.path.dirname(
+                os.path.normpath(os.path.abspath(self.current_image_path))) == directory:
+            self.update_image_list()
+            self.prefetch_neighbors()
+            self.update_window_title()
+
+    def is_scanning_directory(self):
+        """当前图片所在目录是否正在后台扫描"""
+        if not self.current_image_path:
+            return False
+        return os.path.dirname(os.path.normpath(os.path.abspath(self.current_image_path))) in self._scanning_dirs
+
+    def invalidate_directory_cache(self, directory, removed=None):
+        """目录内容被本程序修改后，让该目录的扫描缓存失效
+
+        旧列表保留，供后台重新扫描期间使用；removed 为已删除的文件路径时先从旧列表中去掉。
+        """
+        directory = os.path.normpath(os.path.abspath(directory))
+        cached = self._dir_cache.get(directory)
+        if cached is None:
+            return
+        files = cached[1]
+        if removed in cached[2]:
+            files = [path for path in files if path != removed]
+        self.cache_directory_listing(directory, None, files)
+
+    def update_image_list(self, blocking=False):
+        """更新当前目录的图片列表
+
+        默认不在 GUI 线程中扫描目录（见 list_directory_images）；需要立即得到准确列表时传入 blocking=True。
+        """
         try:
             if not self.current_image_path:
-                self.image_list = []
+                self.image_list, self._image_index = [], {}
                 self.current_image_index = -1
                 return
 
@@ -805,27 +1650,17 @@ class ImageViewer(QMainWindow):
             # 获取当前图片所在目录
             directory = os.path.dirname(current_normalized)
 
-            # 支持的图片格式
-            image_extensions = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.webp')
-
-            # 获取目录中所有图片文件
-            all_files = []
-            for file in os.listdir(directory):
-                if file.lower().endswith(image_extensions):
-                    full_path = os.path.normpath(os.path.join(directory, file))
-                    # 确保文件真实存在且可访问
-                    if os.path.exists(full_path) and os.path.isfile(full_path):
-                        all_files.append(full_path)
-
-            # 按文件名排序
-            all_files.sort()
-
-            self.image_list = all_files
+            # 获取目录中所有图片文件（目录未变化时直接使用缓存）
+            self.image_list, self._image_index = self.list_directory_images(directory, blocking)
+            if self._pending_deletes:
+                # 后台尚未删除完的文件不再出现在列表中
+                self.image_list = [path for path in self.image_list if path not in self._pending_deletes]
+                self._image_index = {path: i for i, path in enumerate(self.image_list)}
 
             # 找到当前图片的索引
             try:
-                self.current_image_index = self.image_list.index(current_normalized)
-            except ValueError:
+                self.current_image_index = self._image_index[current_normalized]
+            except KeyError:
                 # 如果找不到，尝试比较文件名
                 current_filename = os.path.basename(current_normalized)
                 for i, path in enumerate(self.image_list):
@@ -835,15 +1670,15 @@ class ImageViewer(QMainWindow):
                 else:
                     self.current_image_index = -1
 
-            print(f"Debug: Found {len(self.image_list)} images, current index: {self.current_image_index}")
-            print(f"Debug: Current path: {current_normalized}")
+            logger.debug("Found %s images, current index: %s", len(self.image_list), self.current_image_index)
+            logger.debug("Current path: %s", current_normalized)
             if self.image_list:
-                print(f"Debug: First image in list: {self.image_list[0]}")
+                logger.debug("First image in list: %s", self.image_list[0])
 
         except Exception as e:
             print(f"Error updating image list: {str(e)}")
             print(traceback.format_exc())
-            self.image_list = []
+            self.image_list, self._image_index = [], {}
             self.current_image_index = -1
 
     def show_previous_image(self):
@@ -853,7 +1688,8 @@ class ImageViewer(QMainWindow):
                 self.update_image_list()
 
             if not self.image_list:
-                self.show_notification("当前目录没有其他图片")
+                self.show_notification("正在读取图片列表…" if self.is_scanning_directory()
+                                       else "当前目录没有其他图片")
                 return
 
             if self.current_image_index <= 0:
@@ -862,6 +1698,7 @@ class ImageViewer(QMainWindow):
 
             # 加载上一张图片
             self.current_image_index -= 1
+            self._browse_direction = -1
             next_image_path = self.image_list[self.current_image_index]
             self.load_image(next_image_path)
 
@@ -880,7 +1717,8 @@ class ImageViewer(QMainWindow):
                 self.update_image_list()
 
             if not self.image_list:
-                self.show_notification("当前目录没有其他图片")
+                self.show_notification("正在读取图片列表…" if self.is_scanning_directory()
+                                       else "当前目录没有其他图片")
                 return
 
             if self.current_image_index >= len(self.image_list) - 1:
@@ -889,6 +1727,7 @@ class ImageViewer(QMainWindow):
 
             # 加载下一张图片
             self.current_image_index += 1
+            self._browse_direction = 1
             next_image_path = self.image_list[self.current_image_index]
             self.load_image(next_image_path)
 
@@ -918,54 +1757,43 @@ class ImageViewer(QMainWindow):
             # 获取上层目录
             parent_dir = os.path.dirname(current_dir)
 
-            # 目标路径
+            # 目标路径；已存在时由后台任务在创建副本时改用编号路径
             destination = os.path.join(parent_dir, filename)
 
-            # 如果目标文件已存在，添加编号
-            if os.path.exists(destination):
-                name, ext = os.path.splitext(filename)
-                counter = 1
-                while os.path.exists(destination):
-                    new_filename = f"{name}_{counter}{ext}"
-                    destination = os.path.join(parent_dir, new_filename)
-                    counter += 1
-
-            # 复制文件
-            import shutil
-            shutil.copy2(self.current_image_path, destination)
-
-            # 复制成功后，删除当前图片（会自动加载下一张）
-            copied_filename = os.path.basename(destination)
-            self.delete_current_image()
+            # 复制和删除都在后台线程中依次完成（复制失败时不删除），当前图片立即切换到下一张，
+            # 完成后由 _on_delete_finished 显示副本的实际名字
+            self.delete_current_image(copy_to=destination)
 
             # 显示通知（覆盖删除操作的通知）
-            self.show_notification(f"已复制到上层: {copied_filename}")
+            self.show_notification(f"正在复制到上层: {filename}")
 
         except Exception as e:
             self.show_notification(f"操作失败: {str(e)}")
             print(traceback.format_exc())
 
     def eventFilter(self, obj, event):
-        """事件过滤器，拦截滚动区域的方向键事件"""
-        if obj == self.scroll_area and event.type() == QEvent.KeyPress:
+        """事件过滤器，拦截滚动区域的方向键事件，并在图像标签大小变化时更新坐标变换"""
+        if obj is self.image_label and event.type() == QEvent.Resize:
+            self._image_transform = None
+        elif obj == self.scroll_area and event.type() == QEvent.KeyPress:
             key = event.key()
             # 如果是方向键，转发到主窗口处理
             if key in (Qt.Key_Left, Qt.Key_Right, Qt.Key_Up, Qt.Key_Down):
-                print(f"Debug: Arrow key intercepted by event filter: {key}")
+                logger.debug("Arrow key intercepted by event filter: %s", key)
                 self.keyPressEvent(event)
                 return True  # 阻止事件继续传播
         return super().eventFilter(obj, event)
 
     def keyPressEvent(self, event):
         key = event.key()
-        print(f"Debug: Key pressed: {key}")
-        print(f"Debug: Qt.Key_Left = {Qt.Key_Left}, Qt.Key_Right = {Qt.Key_Right}")
-        print(f"Debug: Qt.Key_Up = {Qt.Key_Up}, Qt.Key_Down = {Qt.Key_Down}")
+        logger.debug("Key pressed: %s", key)
 
         if event.key() == Qt.Key_V and event.modifiers() == Qt.ControlModifier:
             self.paste_image()
         elif event.key() == Qt.Key_Z and event.modifiers() == Qt.ControlModifier:
             self.handle_undo()
+        elif event.key() == Qt.Key_Y and event.modifiers() == Qt.ControlModifier:
+            self.redo()
         elif event.key() == Qt.Key_C and event.modifiers() == Qt.ControlModifier:
             self.copy_image()
         elif event.key() == Qt.Key_Delete:
@@ -973,206 +1801,270 @@ class ImageViewer(QMainWindow):
         elif event.key() == Qt.Key_M and event.modifiers() == Qt.ControlModifier:
             self.copy_to_parent_directory()
         elif event.key() in (Qt.Key_Left, Qt.Key_Up):
-            print("Debug: Left/Up arrow key detected, calling show_previous_image()")
+            logger.debug("Left/Up arrow key detected, calling show_previous_image()")
             self.show_previous_image()
         elif event.key() in (Qt.Key_Right, Qt.Key_Down):
-            print("Debug: Right/Down arrow key detected, calling show_next_image()")
+            logger.debug("Right/Down arrow key detected, calling show_next_image()")
             self.show_next_image()
         else:
             super().keyPressEvent(event)
 
+    def update_image_transform(self):
+        """计算标签坐标到图像坐标的变换，结果缓存在 self._image_transform
+
+        (x 偏移, y 偏移, x 比例, y 比例, 最大 x, 最大 y)，最大坐标用于把结果限制在图像范围内。
+        """
+        self._image_transform = None
+        size = self.image_label.display_size()
+        if not self.image or size.isEmpty():
+            return None
+
+        # 图片按显示尺寸居中绘制
+        offset = self.image_label.image_offset()
+        self._image_transform = (offset.x(), offset.y(),
+                                 self.image.width / size.width(),
+                                 self.image.height / size.height(),
+                                 self.image.width - 1, self.image.height - 1)
+        return self._image_transform
+
+    @log_exceptions(default=(None, None))
     def get_image_coordinates(self, pos):
-        """将窗口坐标转换为图像坐标"""
-        try:
-            if not self.image or not self.image_label.pixmap():
-                return None, None
-
-            # 获取图像标签的几何信息
-            label_rect = self.image_label.geometry()
-            pixmap = self.image_label.pixmap()
-            
-            # 计算图像在标签中的实际显示区域
-            scaled_size = pixmap.size()
-            scaled_size.scale(label_rect.size(), Qt.KeepAspectRatio)
-            
-            # 计算图像的偏移量（居中显示）
-            x_offset = (label_rect.width() - scaled_size.width()) / 2
-            y_offset = (label_rect.height() - scaled_size.height()) / 2
-            
-            # 将窗口坐标转换为图像坐标，考虑缩放因子
-            image_x = (pos.x() - x_offset) * self.image.width / (scaled_size.width() * self.scale_factor)
-            image_y = (pos.y() - y_offset) * self.image.height / (scaled_size.height() * self.scale_factor)
-            
-            # 确保坐标在图像范围内
-            image_x = max(0, min(image_x, self.image.width - 1))
-            image_y = max(0, min(image_y, self.image.height - 1))
-            
-            return int(image_x), int(image_y)
-        except Exception as e:
-            print(f"坐标转换错误: {str(e)}")
+        """将图像标签坐标转换为图像坐标"""
+        if self.image is None:
             return None, None
 
-    def apply_blur_at_point(self, x, y):
-        try:
-            if not self.image:
-                return
+        # 鼠标移动时每个事件都会调用：只使用缓存的变换，不再访问图像和标签的属性
+        transform = self._image_transform or self.update_image_transform()
+        if transform is None:
+            return None, None
+        x_offset, y_offset, inv_sx, inv_sy, max_x, max_y = transform
 
-            # 确保图像是RGBA模式
-            if self.image.mode != 'RGBA':
-                self.image = self.image.convert('RGBA')
+        # 转换并确保坐标在图像范围内
+        image_x = int((pos.x() - x_offset) * inv_sx)
+        image_y = int((pos.y() - y_offset) * inv_sy)
+        image_x = 0 if image_x < 0 else (max_x if image_x > max_x else image_x)
+        image_y = 0 if image_y < 0 else (max_y if image_y > max_y else image_y)
+        return image_x, image_y
 
-            # 获取笔刷范围
-            left = max(0, x - self.brush_size)
-            top = max(0, y - self.brush_size)
-            right = min(self.image.width, x + self.brush_size)
-            bottom = min(self.image.height, y + self.brush_size)
+    @log_exceptions()
+    def apply_blur_at_point(self, x, y):
+        if not self.image:
+            return
 
-            # 确保区域有效
-            if right <= left or bottom <= top:
-                return
+        # 获取笔刷范围
+        left = max(0, x - self.brush_size)
+        top = max(0, y - self.brush_size)
+        right = min(self.image.width, x + self.brush_size)
+        bottom = min(self.image.height, y + self.brush_size)
 
-            # 提取区域并应用模糊效果
-            region = self.image.crop((left, top, right, bottom))
-            if region.size[0] > 0 and region.size[1] > 0:
-                # 确保区域也是RGBA模式
-                if region.mode != 'RGBA':
-                    region = region.convert('RGBA')
-                blurred = region.resize((max(1, (right-left)//4), max(1, (bottom-top)//4))).resize((right-left, bottom-top))
-                self.image.paste(blurred, (left, top))
-        except Exception as e:
-            QMessageBox.critical(self, '错误', f'应用模糊效果失败: {str(e)}')
-            print(traceback.format_exc())
-
-    def mousePressEvent(self, event):
-        try:
-            if event.button() == Qt.LeftButton and self.image:
-                # 如果处于触摸模式，不触发涂鸦，完全禁用
-                if self.is_in_touch_mode:
-                    return
+        # 确保区域有效
+        if right <= left or bottom <= top:
+            return
 
-                if event.modifiers() == Qt.AltModifier:  # 按住Alt键进行平移
-                    self.panning = True
-                    self.last_pan_pos = event.pos()
-                    self.setCursor(Qt.ClosedHandCursor)
-                else:  # 正常的绘画操作
-                    self.drawing = True
-                    self.add_to_history()
-                    pos = self.image_label.mapFrom(self, event.pos())
-
-                    if self.current_tool == 'arrow':
-                        # 箭头工具：记录起点
-                        self.arrow_start_point = pos
-                        self.arrow_end_point = pos
-                        # 保存当前图像用于预览
-                        self.temp_arrow_layer = self.image.copy()
+        # 模糊结果来自笔画开始前图像的分块缓存，笔刷经过的区域只需拷贝像素
+        blurred = self.blurred_region(left, top, right, bottom, max(1, self.brush_size // 2))
+        self.protect_region(left, top, right, bottom)
+        self._np[top:bottom, left:right] = blurred
+
+    def blurred_region(self, left, top, right, bottom, size):
+        """返回笔画开始前的图像做均值模糊后 [top:bottom, left:right] 区域的像素
+
+        模糊结果按 BLUR_TILE_SIZE 分块、在首次用到时计算并缓存到笔画结束，
+        同一笔画反复经过的区域不再重复计算。
+        """
+        if self._blur_tiles_size != size:
+            self._blur_tiles = {}
+            self._blur_tiles_size = size
+        height, width = self._np.shape[:2]
+        t = BLUR_TILE_SIZE
+        out = np.empty((bottom - top, right - left, 4), dtype=np.uint8)
+        for ty in range(top // t, (bottom - 1) // t + 1):
+            for tx in range(left // t, (right - 1) // t + 1):
+                x0, y0 = tx * t, ty * t
+                tile = self._blur_tiles.get((tx, ty))
+                if tile is None:
+                    # 多取 size 像素的边距，使块边缘的结果与整图模糊一致
+                    x1, y1 = min(width, x0 + t), min(height, y0 + t)
+                    sx0, sy0 = max(0, x0 - size), max(0, y0 - size)
+                    sx1, sy1 = min(width, x1 + size), min(height, y1 + size)
+                    if self._pre_stroke is not None:
+                        source = self._pre_stroke.region(sx0, sy0, sx1, sy1)
                     else:
-                        self.last_point = pos
-                        self.apply_effect(pos)
-        except Exception as e:
-            QMessageBox.critical(self, '错误', f'鼠标按下事件失败: {str(e)}')
-            print(traceback.format_exc())
-
-    def mouseMoveEvent(self, event):
-        try:
-            # 如果处于触摸模式，不触发涂鸦
+                        source = self._np[sy0:sy1, sx0:sx1]
+                    blurred = box_blur(source, size)
+                    tile = blurred[y0 - sy0:y1 - sy0, x0 - sx0:x1 - sx0]
+                    self._blur_tiles[(tx, ty)] = tile
+                # 把块与请求区域的交集拷贝到输出
+                ix0, iy0 = max(left, x0), max(top, y0)
+                ix1, iy1 = min(right, x0 + tile.shape[1]), min(bottom, y0 + tile.shape[0])
+                out[iy0 - top:iy1 - top, ix0 - left:ix1 - left] = tile[iy0 - y0:iy1 - y0, ix0 - x0:ix1 - x0]
+        return out
+
+    @log_exceptions()
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton and self.image:
+            # 如果处于触摸模式，不触发涂鸦，完全禁用
             if self.is_in_touch_mode:
                 return
 
-            if self.panning and self.last_pan_pos:
-                # 计算移动距离
-                delta = event.pos() - self.last_pan_pos
-                # 更新滚动条位置
-                self.scroll_area.horizontalScrollBar().setValue(
-                    self.scroll_area.horizontalScrollBar().value() - delta.x())
-                self.scroll_area.verticalScrollBar().setValue(
-                    self.scroll_area.verticalScrollBar().value() - delta.y())
+            if event.modifiers() == Qt.AltModifier:  # 按住Alt键进行平移
+                self.panning = True
                 self.last_pan_pos = event.pos()
-            elif self.drawing and self.image:
+                self.setCursor(Qt.ClosedHandCursor)
+            elif self._loading_path is None:  # 正常的绘画操作（新图片加载完成前不响应）
+                self.drawing = True
+                self.begin_stroke()
                 pos = self.image_label.mapFrom(self, event.pos())
 
-                if self.current_tool == 'arrow' and self.arrow_start_point:
-                    # 箭头工具：更新终点并显示预览
+                if self.current_tool == 'arrow':
+                    # 箭头工具：记录起点
+                    self.arrow_start_point = pos
                     self.arrow_end_point = pos
-                    # 恢复原始图像
-                    self.image = self.temp_arrow_layer.copy()
-                    # 绘制预览箭头
-                    start_x, start_y = self.get_image_coordinates(self.arrow_start_point)
-                    end_x, end_y = self.get_image_coordinates(self.arrow_end_point)
-                    if start_x is not None and end_x is not None:
-                        draw = ImageDraw.Draw(self.image)
-                        self.draw_arrow(draw, start_x, start_y, end_x, end_y,
-                                      self.brush_color.getRgb()[:3], self.arrow_width)
-                    self.display_image()
+                    # 预览时用笔画开始前的快照恢复像素
+                    self.temp_arrow_layer = self._pre_stroke
+                    self._arrow_rect = QRect()
                 else:
-                    self.apply_effect(pos)
                     self.last_point = pos
-        except Exception as e:
-            QMessageBox.critical(self, '错误', f'鼠标移动事件失败: {str(e)}')
-            print(traceback.format_exc())
-
-    def mouseReleaseEvent(self, event):
-        try:
-            if event.button() == Qt.LeftButton:
-                # 如果处于触摸模式，不触发涂鸦
-                if self.is_in_touch_mode:
-                    return
+                    self.apply_effect(pos)
 
-                if self.panning:
-                    self.panning = False
-                    self.last_pan_pos = None
-                    self.setCursor(Qt.ArrowCursor)
-                else:
-                    if self.current_tool == 'arrow' and self.arrow_start_point and self.arrow_end_point:
-                        # 箭头工具：完成绘制
-                        # 恢复原始图像
-                        self.image = self.temp_arrow_layer.copy()
-                        # 绘制最终箭头
-                        start_x, start_y = self.get_image_coordinates(self.arrow_start_point)
-                        end_x, end_y = self.get_image_coordinates(self.arrow_end_point)
-                        if start_x is not None and end_x is not None:
-                            draw = ImageDraw.Draw(self.image)
-                            self.draw_arrow(draw, start_x, start_y, end_x, end_y,
-                                          self.brush_color.getRgb()[:3], self.arrow_width)
-                        # 清除箭头状态
-                        self.arrow_start_point = None
-                        self.arrow_end_point = None
-                        self.temp_arrow_layer = None
-
-                    self.drawing = False
-                    self.display_image()
-        except Exception as e:
-            QMessageBox.critical(self, '错误', f'鼠标释放事件失败: {str(e)}')
-            print(traceback.format_exc())
+    @log_exceptions()
+    def mouseMoveEvent(self, event):
+        # 如果处于触摸模式，不触发涂鸦
+        if self.is_in_touch_mode:
+            return
 
-    def apply_effect(self, pos):
-        try:
-            if not self.image:
+        if self.panning and self.last_pan_pos:
+            # 计算移动距离，合并到下一帧更新滚动条位置
+            delta = event.pos() - self.last_pan_pos
+            self.scroll_by(-delta.x(), -delta.y())
+            self.last_pan_pos = event.pos()
+        elif self.drawing and self.image:
+            pos = self.image_label.mapFrom(self, event.pos())
+
+            if self.current_tool == 'arrow' and self.arrow_start_point:
+                # 箭头工具：更新终点并显示预览
+                self.arrow_end_point = pos
+                self.update_arrow_preview()
+            else:
+                self._pending_points.append(pos)
+                if not self._stroke_timer.isActive():
+                    self._stroke_timer.start()
+
+    @log_exceptions()
+    def flush_stroke_points(self):
+        """处理拖动笔刷时积累的鼠标位置
+
+        鼠标事件频率可能远高于刷新率；映射到同一图像像素的连续位置只处理一次，
+        其余位置依次画出线段（或模糊），显示仍由 schedule_display 合并刷新。
+        """
+        self._stroke_timer.stop()
+        points, self._pending_points = self._pending_points, []
+        if not self.drawing or not self.image:
+            return
+        previous = self.get_image_coordinates(self.last_point) if self.last_point else None
+        for pos in points:
+            coords = self.get_image_coordinates(pos)
+            if coords == previous:
+                continue
+            self.apply_effect(pos, coords, previous)
+            self.last_point = pos
+            previous = coords
+
+    @log_exceptions()
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            # 如果处于触摸模式，不触发涂鸦
+            if self.is_in_touch_mode:
                 return
 
-            # 获取图像坐标
-            x, y = self.get_image_coordinates(pos)
-            if x is None or y is None:
-                return
+            if self.panning:
+                self.panning = False
+                self.last_pan_pos = None
+                self.setCursor(Qt.ArrowCursor)
+            else:
+                self.flush_stroke_points()
+                if self.current_tool == 'arrow' and self.arrow_start_point and self.arrow_end_point:
+                    # 箭头工具：完成绘制
+                    self.update_arrow_preview()
+                    # 清除箭头状态
+                    self.arrow_start_point = None
+                    self.arrow_end_point = None
+                    self.temp_arrow_layer = None
+
+                self.drawing = False
+                self.end_stroke()
+                # 立即刷新尚未显示的笔画
+                self.finish_display()
+
+    @log_exceptions()
+    def apply_effect(self, pos, coords=None, last_coords=None):
+        """在 pos（图像标签坐标）处绘制或模糊；coords、last_coords 为调用方已换算好的
+        pos 与 self.last_point 的图像坐标，省略时在这里换算"""
+        if not self.image:
+            return
 
-            # 确保图像是RGBA模式
-            if self.image.mode != 'RGBA':
-                self.image = self.image.convert('RGBA')
-
-            if self.current_tool == 'blur':
-                self.apply_blur_at_point(x, y)
-            else:  # draw
-                draw = ImageDraw.Draw(self.image)
-                if self.last_point:
-                    last_x, last_y = self.get_image_coordinates(self.last_point)
-                    if last_x is not None and last_y is not None:
-                        draw.line([(last_x, last_y), (x, y)], 
-                                fill=self.brush_color.getRgb()[:3], 
-                                width=self.brush_size)
+        # 获取图像坐标
+        x, y = coords or self.get_image_coordinates(pos)
+        if x is None or y is None:
+            return
 
-            self.display_image()
-        except Exception as e:
-            QMessageBox.critical(self, '错误', f'应用效果失败: {str(e)}')
-            print(traceback.format_exc())
+        r = self.brush_size
+        if self.current_tool == 'blur':
+            self.apply_blur_at_point(x, y)
+            dirty = QRect(x - r, y - r, 2 * r, 2 * r)
+        else:  # draw
+            dirty = QRect(x - r, y - r, 2 * r, 2 * r)
+            if self.last_point:
+                last_x, last_y = last_coords or self.get_image_coordinates(self.last_point)
+                if last_x is not None and last_y is not None:
+                    dirty = dirty.united(QRect(last_x - r, last_y - r, 2 * r, 2 * r))
+                    self.protect_region(dirty.left(), dirty.top(), dirty.right() + 1, dirty.bottom() + 1)
+                    # 直接在像素缓冲区上光栅化线段，不再每次创建 ImageDraw
+                    draw_thick_line(self._np, last_x, last_y, x, y, self.brush_size,
+                                    self._brush_rgba)
+
+        self._stroke_rect = self._stroke_rect.united(dirty)
+        self.schedule_display(dirty)
+
+    def draw_in_region(self, rect, paint):
+        """在 rect 区域（图像坐标）的副本上用 ImageDraw 绘制，再写回像素缓冲区
+
+        paint(draw, ox, oy) 中 ox/oy 为区域左上角坐标，绘制时需减去该偏移。
+        返回实际写回的区域。
+        """
+        rect = rect.intersected(QRect(0, 0, self.image.width, self.image.height))
+        if rect.isEmpty():
+            return rect
+        self.protect_region(rect.left(), rect.top(), rect.right() + 1, rect.bottom() + 1)
+        view = self._np[rect.top():rect.bottom() + 1, rect.left():rect.right() + 1]
+        region = Image.fromarray(view, 'RGBA')
+        paint(ImageDraw.Draw(region), rect.left(), rect.top())
+        view[...] = np.asarray(region)
+        return rect
+
+    def update_arrow_preview(self):
+        """恢复上一次预览箭头覆盖的区域，并按当前起点、终点重新绘制箭头"""
+        dirty = self._arrow_rect
+        if not dirty.isEmpty():
+            top, bottom = dirty.top(), dirty.bottom() + 1
+            left, right = dirty.left(), dirty.right() + 1
+            self._np[top:bottom, left:right] = self.temp_arrow_layer.region(left, top, right, bottom)
+        self._arrow_rect = QRect()
+
+        start_x, start_y = self.get_image_coordinates(self.arrow_start_point)
+        end_x, end_y = self.get_image_coordinates(self.arrow_end_point)
+        if start_x is not None and end_x is not None:
+            # 箭头头部最多向外延伸 arrow_head_length，再加上线宽
+            margin = max(self.arrow_width * 4, 20) + self.arrow_width
+            rect = QRect(QPoint(min(start_x, end_x), min(start_y, end_y)),
+                         QPoint(max(start_x, end_x), max(start_y, end_y)))
+            rect = rect.adjusted(-margin, -margin, margin, margin)
+            color = self._brush_rgb
+            self._arrow_rect = self.draw_in_region(rect, lambda draw, ox, oy: self.draw_arrow(
+                draw, start_x - ox, start_y - oy, end_x - ox, end_y - oy, color, self.arrow_width))
+            self._stroke_rect = self._stroke_rect.united(self._arrow_rect)
+            dirty = dirty.united(self._arrow_rect)
+        self.schedule_display(dirty)
 
     def draw_arrow(self, draw_obj, start_x, start_y, end_x, end_y, color, width):
         """绘制箭头的辅助方法"""
@@ -1221,12 +2113,13 @@ class ImageViewer(QMainWindow):
 
     def set_tool(self, tool):
         self.current_tool = tool
+        # 用自动消失的通知代替模态对话框，切换工具后可以直接继续操作
         if tool == 'draw':
-            QMessageBox.information(self, '工具切换', '已切换到涂鸦工具')
+            self.show_notification('已切换到涂鸦工具')
         elif tool == 'blur':
-            QMessageBox.information(self, '工具切换', '已切换到模糊工具')
+            self.show_notification('已切换到模糊工具')
         else:
-            QMessageBox.information(self, '工具切换', '已切换到箭头工具\n\n使用方法：\n1. 点击设置箭头起点\n2. 拖动到终点位置\n3. 释放鼠标完成绘制')
+            self.show_notification('已切换到箭头工具：按下设置起点，拖动到终点后松开完成绘制', 3000)
 
     def set_brush_size(self):
         size, ok = QInputDialog.getInt(self, '设置笔刷大小', 
@@ -1238,7 +2131,13 @@ class ImageViewer(QMainWindow):
     def set_color(self):
         color = QColorDialog.getColor(self.brush_color, self, '选择颜色')
         if color.isValid():
-            self.brush_color = color
+            self.set_brush_color(color)
+
+    def set_brush_color(self, color):
+        """设置画笔颜色，同时缓存绘制时直接使用的颜色值，不必每个鼠标事件都从 QColor 转换"""
+        self.brush_color = color
+        self._brush_rgb = color.getRgb()[:3]  # 箭头（ImageDraw）使用的 RGB 元组
+        self._brush_rgba = np.array(self._brush_rgb + (255,), dtype=np.uint8)  # 涂鸦写入像素缓冲区的值
 
     def open_image(self):
         try:
@@ -1252,17 +2151,8 @@ class ImageViewer(QMainWindow):
             )
 
             if file_path:
-                self.image = Image.open(file_path)
-                self.last_save_path = file_path  # 同时更新保存路径
-                self.current_image_path = file_path  # 设置当前图片路径
-                self.add_to_history()
-                self.display_image()
-
-                # 更新图片列表
-                self.update_image_list()
-
-                # 更新窗口标题显示图片名称
-                self.update_window_title()
+                # 在后台解码，完成后更新路径、图片列表和窗口标题
+                self.load_image(file_path)
         except Exception as e:
             QMessageBox.critical(self, '错误', f'打开图片失败: {str(e)}')
             print(traceback.format_exc())
@@ -1285,61 +2175,371 @@ class ImageViewer(QMainWindow):
                 )
                 
                 if file_path:
-                    # 保存图像
-                    self.image.save(file_path)
-                    # 记住这次的保存路径，以便下次使用
-                    self.last_save_path = file_path
-                    QMessageBox.information(self, '提示', '图片保存成功')
+                    if self.is_saved_unchanged(file_path):
+                        # 文件内容已经就是当前像素，不再重新编码
+                        self.last_save_path = file_path
+                        self.show_notification(f"{os.path.basename(file_path)} 没有修改，无需保存")
+                        return
+                    # 在后台线程中编码保存当前像素的副本，结果由 _on_save_finished 提示
+                    self._pending_save = (os.path.normpath(os.path.abspath(file_path)), self._pixel_version)
+                    self._file_pool.start(_SaveTask(file_path, self._np.copy(), self._save_signals))
+                    self.show_notification(f"正在保存 {os.path.basename(file_path)}…")
             except Exception as e:
                 QMessageBox.critical(self, '错误', f'保存图片失败: {str(e)}')
                 import traceback
                 print(traceback.format_exc())
 
+    def _on_save_finished(self, file_path, error):
+        """后台保存完成（GUI 线程）"""
+        if error:
+            QMessageBox.critical(self, '错误', f'保存图片失败: {error}')
+            return
+        # 记住这次的保存路径，以便下次使用
+        self.last_save_path = file_path
+        path = os.path.normpath(os.path.abspath(file_path))
+        if self._pending_save is not None and self._pending_save[0] == path:
+            try:
+                self._saved_state = (path, self._pending_save[1], os.stat(path).st_mtime_ns)
+            except OSError:
+                self._saved_state = None
+            self._pending_save = None
+        self.show_notification(f'已保存 {os.path.basename(file_path)}')
+
+    def is_saved_unchanged(self, file_path):
+        """file_path 是否已经保存着当前像素：刚打开且未编辑的原文件，或上次保存后既没有编辑、文件也没被改动"""
+        path = os.path.normpath(os.path.abspath(file_path))
+        if self.is_current_image_unchanged(path):
+            return True
+        if self._saved_state is None or self._saved_state[:2] != (path, self._pixel_version):
+            return False
+        try:
+            return os.stat(path).st_mtime_ns == self._saved_state[2]
+        except OSError:
+            return False
+
+    def schedule_display(self, rect=None):
+        """登记需要刷新的图像区域（图像坐标，None 表示整张图），合并到下一帧统一刷新"""
+        if not self.image:
+            return
+        if rect is None:
+            rect = QRect(0, 0, self.image.width, self.image.height)
+        self._dirty_rect = self._dirty_rect.united(rect)
+        if not self._repaint_timer.isActive():
+            self._repaint_timer.start()
+
+    def flush_display(self):
+        """立即执行尚未完成的合并刷新"""
+        if self._repaint_timer.isActive():
+            self._repaint_timer.stop()
+        self._do_display()
+
+    @log_exceptions()
+    def _do_display(self):
+        """只把脏区域同步到 self.pixmap 和显示用的缩放 pixmap，不做整图缩放"""
+        dirty = self._dirty_rect
+        self._dirty_rect = QRect()
+        if not self.image or dirty.isEmpty():
+            return
+
+        image_rect = QRect(0, 0, self.image.width, self.image.height)
+        dirty = dirty.intersected(image_rect)
+        if self.pixmap is None or self.pixmap.size() != image_rect.size() or dirty == image_rect:
+            self.display_image()
+            return
+        if dirty.isEmpty():
+            return
+
+        # self._qimage 与像素缓冲区共享内存，直接拷贝脏区域即可
+        painter = QPainter(self.pixmap)
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        painter.drawImage(dirty.topLeft(), self._qimage, dirty)
+        painter.end()
+        self._mips_stale = True
+
+        if self._scaled_pixmap is None:
+            # 原尺寸或放大显示：控件直接引用 self.pixmap，只需重绘脏区域
+            self.image_label.update_pixmap_rect(QRectF(dirty))
+            return
+
+        # 缩小显示时，交互过程中只把脏区域快速（最近邻）缩放后画到控件引用的较小 pixmap 上，
+        # 松开鼠标后再由 show_scaled_pixmap 整体平滑缩放一次。
+        # 源取刚更新过的 self.pixmap（原生格式），缩放时不必再逐像素转换 RGBA 字节序
+        sx = self._scaled_pixmap.width() / self.pixmap.width()
+        sy = self._scaled_pixmap.height() / self.pixmap.height()
+        target = QRectF(dirty.x() * sx, dirty.y() * sy, dirty.width() * sx, dirty.height() * sy)
+        painter = QPainter(self._scaled_pixmap)
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        painter.drawPixmap(target, self.pixmap, QRectF(dirty))
+        painter.end()
+        self._unsmoothed_rect = self._unsmoothed_rect.united(dirty)
+        self.image_label.update_pixmap_rect(target)
+
+    def finish_display(self):
+        """立即刷新剩余的脏区域；缩小显示时拖动过程中是快速缩放的，再平滑缩放一次
+
+        预先缩小的显示只重新平滑缩放笔画改过的区域，不再整图缩放。
+        """
+        self.flush_display()
+        if self.pixmap is None or self._scaled_pixmap is None:
+            return
+        rect = self._unsmoothed_rect
+        if self._prescaled and rect.isEmpty():
+            return
+        if self._prescaled and rect.width() * rect.height() * 4 <= self.pixmap.width() * self.pixmap.height():
+            self.resmooth_region(rect)
+        else:
+            # 笔画刚修改过 self.pixmap，为一次缩放重建全部 mipmap 并不划算，直接从原图缩放
+            self.show_scaled_pixmap(use_mips=False)
+
+    def resmooth_region(self, rect):
+        """把 self.pixmap 中 rect 区域（图像坐标）重新平滑缩小，写回预先缩小的显示 pixmap"""
+        self._unsmoothed_rect = QRect()
+        scaled = self._scaled_pixmap
+        sx = scaled.width() / self.pixmap.width()
+        sy = scaled.height() / self.pixmap.height()
+        target = QRectF(rect.x() * sx, rect.y() * sy, rect.width() * sx, rect.height() * sy)
+        target = target.toAlignedRect().adjusted(-1, -1, 1, 1).intersected(scaled.rect())
+        if target.isEmpty():
+            return
+        # 源区域向外多取 2 个显示像素，使平滑缩放在 target 边缘的结果与整图缩放一致；
+        # 边界从显示坐标换算回去，缩小比例为 1/2、1/4 等时裁剪区域与整图缩放的采样网格对齐
+        left, top = max(0, target.left() - 2), max(0, target.top() - 2)
+        right = min(scaled.width(), target.right() + 3)
+        bottom = min(scaled.height(), target.bottom() + 3)
+        crop = QRect(QPoint(int(left / sx), int(top / sy)),
+                     QPoint(min(self.pixmap.width(), math.ceil(right / sx)) - 1,
+                            min(self.pixmap.height(), math.ceil(bottom / sy)) - 1))
+        part = self.pixmap.copy(crop).scaled(max(1, round(crop.width() * sx)),
+                                             max(1, round(crop.height() * sy)),
+                                             Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+        # target 在 part 中对应的区域
+        kx, ky = part.width() / crop.width(), part.height() / crop.height()
+        source = QRectF((target.x() / sx - crop.x()) * kx, (target.y() / sy - crop.y()) * ky,
+                        target.width() / sx * kx, target.height() / sy * ky)
+        painter = QPainter(scaled)
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        painter.drawPixmap(QRectF(target), part, source)
+        painter.end()
+        self.image_label.update_pixmap_rect(QRectF(target))
+
+    def rescale_display(self, mode=Qt.SmoothTransformation):
+        """只有缩放比例变化时调用：self.pixmap 始终与像素缓冲区同步，直接按新比例缩放，不再重新转换像素"""
+        self.flush_display()
+        if self.pixmap is None or self.pixmap.size() != self._qimage.size():
+            self.display_image()
+        else:
+            self.show_scaled_pixmap(mode)
+
+    def mip_for_width(self, width):
+        """返回宽度不小于 width 的最小一级 mipmap（没有时返回 self.pixmap），需要时先重建 mipmap"""
+        if self._mips_stale:
+            self._mips = []
+            for key in self._zoom_keys:
+                QPixmapCache.remove(key)
+            self._zoom_keys = []
+            self._zoom_generation += 1
+            mip = self.pixmap
+            while mip.width() >= 512 and mip.height() >= 2:
+                mip = mip.scaled(mip.width() // 2, mip.height() // 2,
+                                 Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+                self._mips.append(mip)
+            self._mips_stale = False
+        for mip in reversed(self._mips):
+            if mip.width() >= width:
+                return mip
+        return self.pixmap
+
+    @log_exceptions()
+    def _flush_zoom(self):
+        """应用合并后的手势缩放：手势过程中快速缩放，结束后再平滑缩放一次"""
+        if self._pending_zoom is None:
+            return
+        scale, h_offset, v_offset = self._pending_zoom
+        self._pending_zoom = None
+        if not self.image:
+            return
+        self.scale_factor = scale
+        self.rescale_display(Qt.FastTransformation)
+        h_bar, v_bar = self._pinch_bars
+        h_bar.setValue(int(h_offset))
+        v_bar.setValue(int(v_offset))
+
+    def _resmooth(self):
+        """交互缩放结束后按平滑模式重新缩放一次"""
+        if self.image and self.pixmap is not None:
+            self.rescale_display()
+
+    def screen_pixel_area(self):
+        """返回窗口所在屏幕的物理像素数（考虑设备像素比），没有屏幕信息时返回无穷大"""
+        handle = self.windowHandle()
+        screen = handle.screen() if handle is not None else QApplication.primaryScreen()
+        if screen is None:
+            return float('inf')
+        size = screen.size()
+        ratio = screen.devicePixelRatio()
+        return size.width() * size.height() * ratio * ratio
+
+    def smooth_scaled(self, source, width, height, cache=True):
+        """把 source 平滑缩小到 width x height；cache 为 True 时复用之前同一尺寸的结果
+
+        来回缩放（缩放、重置、再缩放）会回到相同的显示尺寸，命中缓存时无需重新缩放。
+        source 必须来自 mip_for_width，缓存才会随 self.pixmap 的修改一起失效。
+        """
+        key = f'zoom:{id(self)}:{self._zoom_generation}:{width}x{height}'
+        if cache:
+            scaled = QPixmapCache.find(key)
+            if scaled is not None:
+                return scaled
+        scaled = source.scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        if cache and QPixmapCache.insert(key, scaled):
+            self._zoom_keys.append(key)
+        return scaled
+
+    def show_scaled_pixmap(self, mode=Qt.SmoothTransformation, use_mips=True):
+        """按当前缩放因子显示 self.pixmap
+
+        缩放作为绘制时的视图变换，由 ImageCanvas 只缩放可见区域，不生成缩放后的整图；
+        缩小显示时从 mipmap 中选取尺寸最接近（不小于）显示尺寸的一级作为缩放源，
+        每次缩放只需处理与显示尺寸相当的像素。平滑模式下，缩小后的图不超过屏幕大小时
+        再预先缩小一次，得到平滑的缩小效果；比屏幕还大时只能看到其中一部分，
+        改为绘制时平滑缩放可见区域，整图缩放的开销不随原图尺寸增长。
+        """
+        self._unsmoothed_rect = QRect()
+        self._prescaled = False
+        if self.scale_factor < 1.0:
+            scaled_width = int(self.pixmap.width() * self.scale_factor)
+            scaled_height = int(self.pixmap.height() * self.scale_factor)
+            source = self.mip_for_width(scaled_width) if use_mips else self.pixmap
+            smooth = mode == Qt.SmoothTransformation
+            if smooth and scaled_width * scaled_height <= self.screen_pixel_area():
+                self._scaled_pixmap = self.smooth_scaled(source, scaled_width, scaled_height,
+                                                         cache=use_mips)
+                self._prescaled = True
+                self.image_label.set_pixmap(self._scaled_pixmap)
+            else:
+                # 直接以 mipmap 为源做视图变换（其缩放比例不超过 2 倍，不会明显走样）
+                self._scaled_pixmap = source if source is not self.pixmap else None
+                self.image_label.set_pixmap(source, scaled_width / source.width(), smooth=smooth)
+        else:
+            self._scaled_pixmap = None
+            self.image_label.set_pixmap(self.pixmap, self.scale_factor,
+                                        smooth=(mode == Qt.SmoothTransformation))
+        self.update_image_transform()
+
+    def set_image(self, image):
+        """设置当前图像
+
+        像素统一保存为连续的 RGBA NumPy 缓冲区 self._np；self.image（只读 PIL 视图）
+        和 self._qimage 都直接引用这块内存，显示时无需再 convert/tobytes。
+        修改像素请直接写 self._np（或使用 draw_in_region），不要对 self.image 做原地操作。
+        image 也可以是 (高, 宽, 4) 的连续 uint8 RGBA 数组，此时直接接管该数组作为缓冲区。
+        """
+        pixels = image if isinstance(image, np.ndarray) else pil_to_array(image)
+        height, width = pixels.shape[:2]
+        self._loaded_mtime = None  # 像素已不再对应磁盘上的文件，由 show_loaded_image 重新记录
+        self._pixel_version += 1
+        # QImage 只保存指向缓冲区的裸指针：先替换 self._qimage 再替换 self._np，
+        # 保证任何时刻 self._qimage 引用的数组都仍被 self._np 持有
+        self._qimage = QImage(pixels.data, width, height, width * 4, QImage.Format_RGBA8888)
+        self._np = pixels
+        self.image = Image.frombuffer('RGBA', (width, height), pixels, 'raw', 'RGBA', 0, 1)
+        # 画笔、模糊和箭头都只写入不透明像素，因此只需在设置图像时检查一次
+        self._opaque = bool(pixels[..., 3].min() == 255)
+
     def display_image(self):
         try:
             if self.image:
-                # 将PIL Image转换为QPixmap
-                data = self.image.convert("RGBA").tobytes("raw", "RGBA")
-                qim = QImage(data, self.image.width, self.image.height, QImage.Format_RGBA8888)
-                self.pixmap = QPixmap.fromImage(qim)
-                
-                # 计算缩放后的大小
-                scaled_width = int(self.pixmap.width() * self.scale_factor)
-                scaled_height = int(self.pixmap.height() * self.scale_factor)
-                
-                # 应用缩放
-                scaled_pixmap = self.pixmap.scaled(scaled_width, scaled_height, 
-                                                 Qt.KeepAspectRatio, 
-                                                 Qt.SmoothTransformation)
-                self.image_label.setPixmap(scaled_pixmap)
-                
-                # 调整标签大小以适应缩放后的图片
-                self.image_label.resize(scaled_pixmap.size())
+                # 整图刷新会覆盖所有待刷新区域
+                self._repaint_timer.stop()
+                self._dirty_rect = QRect()
+
+                # self._qimage 直接引用像素缓冲区，无需 convert/tobytes；
+                # 这里一次性转换为 Qt 光栅引擎的原生格式（RGB32 / ARGB32 预乘），
+                # 之后每次绘制 pixmap 都不必再做格式转换，不透明图像还能跳过 alpha 混合
+                native = QImage.Format_RGB32 if self._opaque else QImage.Format_ARGB32_Premultiplied
+                self.pixmap = QPixmap.fromImage(self._qimage.convertToFormat(native))
+                self._mips_stale = True
+                self._showing_preview = False
+                self.show_scaled_pixmap()
         except Exception as e:
             QMessageBox.critical(self, '错误', f'显示图片失败: {str(e)}')
             print(traceback.format_exc())
 
-    def add_to_history(self):
-        if self.image:
+    def reset_history(self):
+        """清空撤销记录（加载或粘贴新图像时调用）"""
+        self.history.clear()
+        self.redo_stack.clear()
+        self._pre_stroke = None
+        self._stroke_rect = QRect()
+
+    def begin_stroke(self):
+        """笔画开始：建立写时复制的像素快照，笔画结束时只从中截取被修改的区域"""
+        self._pre_stroke = _StrokeSnapshot(self._np)
+        self._stroke_rect = QRect()
+        self._blur_tiles = {}
+
+    def protect_region(self, left, top, right, bottom):
+        """笔画中即将修改 [top:bottom, left:right] 区域的像素：先在快照中保存原始像素"""
+        if self._pre_stroke is not None:
+            self._pre_stroke.protect(left, top, right, bottom)
+
+    def end_stroke(self):
+        """笔画结束：把修改区域的原始像素记入撤销记录，并释放快照"""
+        if self._pre_stroke is not None:
+            self.add_to_history(self._stroke_rect)
+        self._pre_stroke = None
+        self._stroke_rect = QRect()
+        self._blur_tiles = {}
+
+    def add_to_history(self, rect):
+        """把本次笔画开始前 rect 区域（图像坐标）的像素作为一条撤销记录保存"""
+        if self.image and self._pre_stroke is not None:
             try:
-                # 确保添加到历史记录的是一个新的副本
-                self.current_step += 1
-                if self.current_step < len(self.history):
-                    self.history = self.history[:self.current_step]
-                # 确保复制的图像是RGBA模式
-                image_copy = self.image.copy()
-                if image_copy.mode != 'RGBA':
-                    image_copy = image_copy.convert('RGBA')
-                self.history.append(image_copy)
+                rect = rect.intersected(QRect(0, 0, self.image.width, self.image.height))
+                if rect.isEmpty():
+                    return
+                left, top = rect.left(), rect.top()
+                right, bottom = rect.right() + 1, rect.bottom() + 1
+
+                # 追加新记录（超过 MAX_HISTORY 条时 deque 自动丢弃最早的记录），并丢弃已撤销的记录
+                pixels = self._pre_stroke.region(left, top, right, bottom)
+                if np.array_equal(pixels, self._np[top:bottom, left:right]):
+                    return  # 笔画没有改变任何像素（如在纯色区域模糊），不记录，也不丢弃重做记录
+                self.history.append(_Delta((left, top, right, bottom), pixels))
+                self.redo_stack.clear()
+                self._pixel_version += 1
+                self.compress_old_history()
+                # 超过字节上限时从最早的记录开始丢弃
+                total = sum(delta.nbytes for delta in self.history)
+                while total > HISTORY_BYTES and len(self.history) > 1:
+                    total -= self.history.popleft().nbytes
             except Exception as e:
                 QMessageBox.critical(self, '错误', f'添加历史记录失败: {str(e)}')
                 print(traceback.format_exc())
 
+    def compress_old_history(self):
+        """压缩撤销栈和重做栈中刚离开栈顶 HISTORY_RAW_ENTRIES 条范围的记录（更早的已经压缩过）"""
+        for stack in (self.history, self.redo_stack):
+            if len(stack) > HISTORY_RAW_ENTRIES:
+                stack[-HISTORY_RAW_ENTRIES - 1].compress()
+
     def undo(self):
-        if self.current_step > 0:
-            self.current_step -= 1
-            self.image = self.history[self.current_step].copy()
-            self.display_image()
+        if self.history:
+            delta = self.history.pop()
+            self.schedule_display(delta.swap(self._np))
+            self.redo_stack.append(delta)
+            self._pixel_version += 1
+            self.compress_old_history()
+            self.finish_display()
+
+    def redo(self):
+        if self.redo_stack:
+            delta = self.redo_stack.pop()
+            self.schedule_display(delta.swap(self._np))
+            self.history.append(delta)
+            self._pixel_version += 1
+            self.compress_old_history()
+            self.finish_display()
 
     def paste_image(self):
         try:
@@ -1354,23 +2554,12 @@ class ImageViewer(QMainWindow):
                     QMessageBox.warning(self, "警告", "剪贴板中的图像无效")
                     return
                 
-                # 使用更可靠的方法转换QImage到PIL Image
-                q_image = q_image.convertToFormat(QImage.Format_RGBA8888)
-                width, height = q_image.width(), q_image.height()
-                
-                # 获取图像数据
-                bits = q_image.constBits()
-                bits.setsize(q_image.byteCount())
-                
-                # 创建PIL图像
-                buffer = bytes(bits)
-                self.image = Image.frombuffer("RGBA", (width, height), buffer, "raw", "RGBA", 0, 1)
+                # 只复制一次像素作为新的像素缓冲区
+                self.set_image(qimage_to_array(q_image))
                 
                 # 重置缩放和历史
                 self.scale_factor = 1.0
-                self.history = []
-                self.history_index = -1
-                self.add_to_history()
+                self.reset_history()
                 
                 # 显示图像
                 self.display_image()
@@ -1384,14 +2573,15 @@ class ImageViewer(QMainWindow):
     def copy_image(self):
         try:
             if self.image:
-                # 将PIL Image转换为QImage
-                data = self.image.convert("RGBA").tobytes("raw", "RGBA")
-                qimage = QImage(data, self.image.width, self.image.height, QImage.Format_RGBA8888)
+                # 直接使用与像素缓冲区共享内存的 self._qimage，不再重新转换；
+                # 剪贴板只做隐式共享而不深拷贝，所以这里复制一次（唯一的一次拷贝），
+                # 之后的编辑或切换图片都不会影响已复制的内容
+                qimage = self._qimage.copy()
                 
                 # 将QImage设置到剪贴板
                 clipboard = QApplication.clipboard()
                 clipboard.setImage(qimage)
-                QMessageBox.information(self, '提示', '图片已复制到剪贴板')
+                self.show_notification('图片已复制到剪贴板')
         except Exception as e:
             QMessageBox.critical(self, '错误', f'复制图片失败: {str(e)}')
             print(traceback.format_exc())
@@ -1407,199 +2597,202 @@ class ImageViewer(QMainWindow):
             return self.touchEndEvent(event)
         return super(ImageViewer, self).event(event)
 
+    @log_exceptions(default=False)
     def gestureEvent(self, event):
         pinch = event.gesture(Qt.PinchGesture)
         if pinch:
             if pinch.state() == Qt.GestureStarted:
                 self._pinch_start_scale_factor = self.scale_factor
+                self._pinch_bars = (self.scroll_area.horizontalScrollBar(),
+                                    self.scroll_area.verticalScrollBar())
+                self._pinch_center = None
                 self.is_pinching = True
                 self.is_in_touch_mode = True  # 进入触摸模式
             elif pinch.state() == Qt.GestureUpdated:
                 self.is_pinching = True
                 new_scale = self._pinch_start_scale_factor * pinch.totalScaleFactor()
                 if self.min_scale <= new_scale <= self.max_scale:
-                    # 获取手势中心点
-                    center_point = pinch.centerPoint().toPoint()
-                    # 转换为相对于 image_label 的坐标
-                    label_pos = self.image_label.mapFromGlobal(self.mapToGlobal(center_point))
-
-                    # 获取滚动条的当前位置
-                    h_bar = self.scroll_area.horizontalScrollBar()
-                    v_bar = self.scroll_area.verticalScrollBar()
-                    h_offset = h_bar.value()
-                    v_offset = v_bar.value()
-
-                    # 计算缩放前的鼠标在完整图片中的位置
-                    before_x = (h_offset + label_pos.x()) / self.scale_factor
-                    before_y = (v_offset + label_pos.y()) / self.scale_factor
-
-                    # 更新缩放因子
-                    self.scale_factor = new_scale
-                    self.display_image()
-
-                    # 计算缩放后的鼠标在完整图片中的位置
-                    after_x = before_x * self.scale_factor
-                    after_y = before_y * self.scale_factor
-
-                    # 计算新的滚动条位置，以保持鼠标下的点不变
-                    new_h_offset = after_x - label_pos.x()
-                    new_v_offset = after_y - label_pos.y()
-
-                    # 设置新的滚动条位置
-                    h_bar.setValue(int(new_h_offset))
-                    v_bar.setValue(int(new_v_offset))
+                    # 手势中心点是屏幕坐标，转换为滚动区域视口内的坐标（中心未移动时沿用上次的结果）
+                    global_center = pinch.centerPoint().toPoint()
+                    if self._pinch_center is None or self._pinch_center[0] != global_center:
+                        self._pinch_center = (global_center,
+                                              self.scroll_area.viewport().mapFromGlobal(global_center))
+                    center = self._pinch_center[1]
+
+                    # 以尚未刷新的缩放状态（如果有）为基准，否则用当前显示的状态
+                    if self._pending_zoom is not None:
+                        scale, h_offset, v_offset = self._pending_zoom
+                    else:
+                        h_bar, v_bar = self._pinch_bars
+                        scale, h_offset, v_offset = self.scale_factor, h_bar.value(), v_bar.value()
+
+                    # 计算新的滚动条位置，以保持手势中心下的点不变：
+                    # 中心点到内容左上角的距离按缩放比例的变化等比放大
+                    ratio = new_scale / scale
+                    new_h_offset = (h_offset + center.x()) * ratio - center.x()
+                    new_v_offset = (v_offset + center.y()) * ratio - center.y()
+
+                    # 手势事件频率可能高于刷新率，合并到下一帧统一缩放和滚动
+                    self._pending_zoom = (new_scale, new_h_offset, new_v_offset)
+                    if not self._zoom_timer.isActive():
+                        self._zoom_timer.start()
             elif pinch.state() == Qt.GestureFinished or pinch.state() == Qt.GestureCanceled:
                 self.is_pinching = False
+                self._zoom_timer.stop()
+                self._flush_zoom()
+                self._resmooth_timer.stop()
+                self._resmooth()
                 # 延迟退出触摸模式
                 QTimer.singleShot(100, self.exit_touch_mode)
 
             return True
         return False
 
+    @log_exceptions(default=False)
     def touchBeginEvent(self, event):
         """处理触摸开始事件"""
-        try:
-            touch_points = event.touchPoints()
-            self.touch_point_count = len(touch_points)
+        touch_points = event.touchPoints()
 
-            # 进入触摸模式
-            self.is_in_touch_mode = True
+        # 进入触摸模式
+        self.is_in_touch_mode = True
 
-            if len(touch_points) == 1:  # 单指触摸
-                point = touch_points[0]
-                self.touch_start_pos = point.pos()
-                self.touch_current_pos = point.pos()
-                self.is_touch_swipe = False
-                self.is_touch_panning = False
+        if len(touch_points) == 1:  # 单指触摸
+            point = touch_points[0]
+            self.touch_start_pos = point.pos()
+            self.touch_current_pos = point.pos()
+            self.is_touch_swipe = False
+            self.is_touch_panning = False
 
-                event.accept()
-                return True
-        except Exception as e:
-            print(f'触摸开始事件失败: {str(e)}')
+            event.accept()
+            return True
         return False
 
+    @log_exceptions(default=False)
     def touchUpdateEvent(self, event):
         """处理触摸更新事件"""
-        try:
-            touch_points = event.touchPoints()
-            self.touch_point_count = len(touch_points)
-
-            # 如果正在双指缩放，不处理单指平移
-            if self.is_pinching or len(touch_points) > 1:
-                return True
-
-            if len(touch_points) == 1 and self.touch_start_pos:  # 单指操作
-                point = touch_points[0]
-                prev_pos = self.touch_current_pos if self.touch_current_pos else self.touch_start_pos
-                self.touch_current_pos = point.pos()
-
-                # 计算从起始点的总距离
-                dx_total = self.touch_current_pos.x() - self.touch_start_pos.x()
-                dy_total = self.touch_current_pos.y() - self.touch_start_pos.y()
-
-                # 计算本次移动的增量
-                dx_delta = self.touch_current_pos.x() - prev_pos.x()
-                dy_delta = self.touch_current_pos.y() - prev_pos.y()
-
-                # 判断是否应该进行平移
-                # 如果还没有确定操作类型，先判断用户意图
-                if not self.is_touch_swipe and not self.is_touch_panning:
-                    # 移动距离足够大才判断意图
-                    if abs(dx_total) > 15 or abs(dy_total) > 15:
-                        # 如果主要是水平移动，标记为可能的滑动
-                        if abs(dx_total) > abs(dy_total) * 1.5:
-                            # 暂时不确定，继续观察
-                            pass
-                        else:
-                            # 主要是垂直或斜向移动，确定为平移
-                            self.is_touch_panning = True
-
-                # 如果已确定为平移，或者用户正在移动
-                if self.is_touch_panning or (abs(dx_delta) > 0 or abs(dy_delta) > 0):
-                    if not self.is_touch_swipe:  # 如果不是滑动模式，就进行平移
+        touch_points = event.touchPoints()
+
+        # 如果正在双指缩放，不处理单指平移
+        if self.is_pinching or len(touch_points) > 1:
+            return True
+
+        if len(touch_points) == 1 and self.touch_start_pos:  # 单指操作
+            point = touch_points[0]
+            prev_pos = self.touch_current_pos if self.touch_current_pos else self.touch_start_pos
+            self.touch_current_pos = point.pos()
+
+            # 计算从起始点的总距离
+            dx_total = self.touch_current_pos.x() - self.touch_start_pos.x()
+            dy_total = self.touch_current_pos.y() - self.touch_start_pos.y()
+
+            # 计算本次移动的增量
+            dx_delta = self.touch_current_pos.x() - prev_pos.x()
+            dy_delta = self.touch_current_pos.y() - prev_pos.y()
+
+            # 判断是否应该进行平移
+            # 如果还没有确定操作类型，先判断用户意图
+            if not self.is_touch_swipe and not self.is_touch_panning:
+                # 移动距离足够大才判断意图
+                if abs(dx_total) > 15 or abs(dy_total) > 15:
+                    # 如果主要是水平移动，标记为可能的滑动
+                    if abs(dx_total) > abs(dy_total) * 1.5:
+                        # 暂时不确定，继续观察
+                        pass
+                    else:
+                        # 主要是垂直或斜向移动，确定为平移
                         self.is_touch_panning = True
-                        # 更新滚动条位置（平移）
-                        h_bar = self.scroll_area.horizontalScrollBar()
-                        v_bar = self.scroll_area.verticalScrollBar()
-                        h_bar.setValue(int(h_bar.value() - dx_delta))
-                        v_bar.setValue(int(v_bar.value() - dy_delta))
 
-                event.accept()
-                return True
-        except Exception as e:
-            print(f'触摸更新事件失败: {str(e)}')
+            # 如果已确定为平移，或者用户正在移动
+            if self.is_touch_panning or (abs(dx_delta) > 0 or abs(dy_delta) > 0):
+                if not self.is_touch_swipe:  # 如果不是滑动模式，就进行平移
+                    self.is_touch_panning = True
+                    # 更新滚动条位置（平移），合并到下一帧
+                    self.scroll_by(-dx_delta, -dy_delta)
+
+            event.accept()
+            return True
         return False
 
+    @log_exceptions(default=False)
     def touchEndEvent(self, event):
         """处理触摸结束事件"""
-        try:
-            # 检查是否应该触发滑动切换图片或点击切换按钮
-            if self.touch_start_pos and self.touch_current_pos:
-                # 计算总滑动距离
-                dx = self.touch_current_pos.x() - self.touch_start_pos.x()
-                dy = self.touch_current_pos.y() - self.touch_start_pos.y()
-
-                # 计算移动距离
-                move_distance = abs(dx) + abs(dy)
-
-                # 如果移动距离很小（小于15像素），认为是点击而非滑动
-                if move_distance < 15:
-                    # 检查点击位置是否在按钮容器内
-                    click_pos = self.mapFromGlobal(event.touchPoints()[0].screenPos().toPoint()) if event.touchPoints() else self.touch_current_pos.toPoint()
-
-                    # 判断点击是否在按钮容器内
-                    is_on_button = False
-                    if self.all_buttons_container.isVisible():
-                        button_rect = self.all_buttons_container.geometry()
-                        if button_rect.contains(click_pos):
-                            is_on_button = True
-
-                    # 只有点击在空白区域时才切换按钮显示/隐藏
-                    if not is_on_button:
-                        self.toggle_touch_buttons()
-                # 判断是否为快速水平滑动（切换图片）
-                # 条件：水平距离超过阈值，且主要是水平方向，且没有被标记为平移
-                elif (abs(dx) > self.swipe_threshold and
-                    abs(dx) > abs(dy) * 1.5 and
-                    not self.is_touch_panning):
-
-                    if dx > 0:
-                        # 向右滑动，显示上一张
-                        self.show_previous_image()
-                    else:
-                        # 向左滑动，显示下一张
-                        self.show_next_image()
+        # 检查是否应该触发滑动切换图片或点击切换按钮
+        if self.touch_start_pos and self.touch_current_pos:
+            # 计算总滑动距离
+            dx = self.touch_current_pos.x() - self.touch_start_pos.x()
+            dy = self.touch_current_pos.y() - self.touch_start_pos.y()
+
+            # 计算移动距离
+            move_distance = abs(dx) + abs(dy)
+
+            # 如果移动距离很小（小于15像素），认为是点击而非滑动
+            if move_distance < 15:
+                # 检查点击位置是否在按钮容器内
+                click_pos = self.mapFromGlobal(event.touchPoints()[0].screenPos().toPoint()) if event.touchPoints() else self.touch_current_pos.toPoint()
+
+                # 判断点击是否在按钮容器内
+                is_on_button = False
+                if self.all_buttons_container.isVisible():
+                    button_rect = self.all_buttons_container.geometry()
+                    if button_rect.contains(click_pos):
+                        is_on_button = True
+
+                # 只有点击在空白区域时才切换按钮显示/隐藏
+                if not is_on_button:
+                    self.toggle_touch_buttons()
+            # 判断是否为快速水平滑动（切换图片）
+            # 条件：水平距离超过阈值，且主要是水平方向，且没有被标记为平移
+            elif (abs(dx) > self.swipe_threshold and
+                abs(dx) > abs(dy) * 1.5 and
+                not self.is_touch_panning):
+
+                if dx > 0:
+                    # 向右滑动，显示上一张
+                    self.show_previous_image()
+                else:
+                    # 向左滑动，显示下一张
+                    self.show_next_image()
 
-            # 重置所有触摸状态
-            self.touch_start_pos = None
-            self.touch_current_pos = None
-            self.is_touch_swipe = False
-            self.is_touch_panning = False
+        # 重置所有触摸状态
+        self.touch_start_pos = None
+        self.touch_current_pos = None
+        self.is_touch_swipe = False
+        self.is_touch_panning = False
 
-            # 延迟退出触摸模式，避免触发鼠标事件
-            QTimer.singleShot(100, self.exit_touch_mode)
+        # 延迟退出触摸模式，避免触发鼠标事件
+        QTimer.singleShot(100, self.exit_touch_mode)
 
-            event.accept()
-            return True
-        except Exception as e:
-            print(f'触摸结束事件失败: {str(e)}')
-        return False
+        event.accept()
+        return True
 
     def exit_touch_mode(self):
         """退出触摸模式"""
         self.is_in_touch_mode = False
 
+    @log_exceptions()
     def wheelEvent(self, event):
-        try:
-            if self.image:
-                # 垂直滚动
-                self.scroll_area.verticalScrollBar().setValue(
-                    self.scroll_area.verticalScrollBar().value() - event.angleDelta().y()
-                )
-                event.accept()
-        except Exception as e:
-            QMessageBox.critical(self, '错误', f'鼠标滚轮事件失败: {str(e)}')
-            print(traceback.format_exc())
+        if not self.image:
+            return
+        # 垂直滚动：累积到下一帧统一应用
+        self.scroll_by(0, -event.angleDelta().y())
+        event.accept()
+
+    def scroll_by(self, dx, dy):
+        """把滚动量累积到下一帧统一应用到滚动条"""
+        self._scroll_delta += QPointF(dx, dy)
+        if not self._scroll_timer.isActive():
+            self._scroll_timer.start()
+
+    @log_exceptions()
+    def _flush_scroll(self):
+        """应用合并后的滚动量"""
+        dx, dy = int(self._scroll_delta.x()), int(self._scroll_delta.y())
+        # 不足一像素的余量留到下一帧
+        self._scroll_delta -= QPointF(dx, dy)
+        h_bar = self.scroll_area.horizontalScrollBar()
+        v_bar = self.scroll_area.verticalScrollBar()
+        h_bar.setValue(h_bar.value() + dx)
+        v_bar.setValue(v_bar.value() + dy)
 
     def zoom_in(self):
         self.scale_image(1.1)
@@ -1614,48 +2807,175 @@ class ImageViewer(QMainWindow):
                 self.scale_factor = 1.0
                 
                 # 将图片恢复到原始大小
-                data = self.image.convert("RGBA").tobytes("raw", "RGBA")
-                qim = QImage(data, self.image.width, self.image.height, QImage.Format_RGBA8888)
-                self.pixmap = QPixmap.fromImage(qim)
-                
-                # 直接使用原始大小显示图片，不进行缩放
-                self.image_label.setPixmap(self.pixmap)
-                self.image_label.resize(self.pixmap.size())
+                self.rescale_display()
                 
                 # 重置滚动条位置
                 self.scroll_area.horizontalScrollBar().setValue(0)
                 self.scroll_area.verticalScrollBar().setValue(0)
                 
                 # 显示提示信息
-                QMessageBox.information(self, '提示', '图片已恢复原始大小')
+                self.show_notification('图片已恢复原始大小')
         except Exception as e:
             QMessageBox.critical(self, '错误', f'重置缩放失败: {str(e)}')
             print(traceback.format_exc())
 
+    @log_exceptions()
     def scale_image(self, factor):
+        if not self.image:
+            return
+        new_scale = self.scale_factor * factor
+        # 确保缩放比例在允许范围内
+        if not self.min_scale <= new_scale <= self.max_scale:
+            return
+        self.scale_factor = new_scale
+        # 连续缩放（按住快捷键）时先快速缩放，停止 80ms 后再平滑缩放一次
+        self.rescale_display(Qt.FastTransformation)
+        self._resmooth_timer.start()
+
+    def cache_image(self, path, mtime, image):
+        """把解码好的图片放入 LRU 缓存，超出容量时丢弃最久未使用的"""
+        old = self._image_cache.pop(path, None)
+        if old is not None:
+            self._image_cache_bytes -= old[1].nbytes
+        self._image_cache[path] = (mtime, image)
+        self._image_cache_bytes += image.nbytes
+        while len(self._image_cache) > 1 and (len(self._image_cache) > IMAGE_CACHE_SIZE
+                                              or self._image_cache_bytes > IMAGE_CACHE_BYTES):
+            _, (_, evicted) = self._image_cache.popitem(last=False)
+            self._image_cache_bytes -= evicted.nbytes
+
+    def get_cached_image(self, path):
+        """返回缓存中仍然有效（文件未修改）的解码像素，没有时返回 None；path 需已规范化"""
+        cached = self._image_cache.get(path)
+        if cached and cached[0] == os.stat(path).st_mtime_ns:
+            self._image_cache.move_to_end(path)
+            return cached[1]
+        return None
+
+    def start_decode(self, path, priority=0, preview_scale=None, editable=False):
+        """在后台线程中解码图片，同一路径不会重复提交"""
+        if path not in self._prefetching:
+            self._prefetching.add(path)
+            self._decode_pool.start(
+                _DecodeTask(path, self._decode_signals, preview_scale, editable), priority)
+
+    def prefetch_neighbors(self):
+        """在后台线程中预读当前图片前后相邻的图片，以及浏览方向上再往后的一张
+
+        同时丢弃离当前图片超过两张的缓存。
+        """
+        index, step = self.current_image_index, self._browse_direction
+        # 离当前图片两张以上（或已不在当前列表中）的缓存不会很快用到，先释放
+        nearby = set(self.image_list[max(0, index - 2):index + 3]) if index >= 0 else set()
+        nearby.add(self.current_image_path)
+        for path in [path for path in self._image_cache if path not in nearby]:
+            self._image_cache_bytes -= self._image_cache.pop(path)[1].nbytes
+        for i in (index + step, index - step, index + 2 * step):
+            if 0 <= i < len(self.image_list):
+                path = self.image_list[i]
+                if path not in self._image_cache:
+                    self.start_decode(path)
+
+    def _on_image_decoded(self, path, mtime, image, editable, error):
+        """后台解码完成（GUI 线程）：放入缓存，如果正在等待这张图片则显示它"""
+        self._prefetching.discard(path)
+        if image is not None:
+            self.cache_image(path, mtime, image)
+        if path != self._loading_path:
+            return  # 预读，或者用户已经切换到别的图片
+
         try:
-            if self.image:
-                new_scale = self.scale_factor * factor
-                
-                # 确保缩放比例在允许范围内
-                if self.min_scale <= new_scale <= self.max_scale:
-                    self.scale_factor = new_scale
-                    self.display_image()
+            if image is not None and mtime != os.stat(path).st_mtime_ns:
+                # 解码期间文件被改写，重新解码
+                self.start_decode(path, priority=1, editable=True)
+                return
+        except OSError as e:
+            image, error = None, str(e)
+        self._loading_path = None
+        if image is None:
+            # 编辑会写入仍是上一张的当前图像，先把标签上失败图片的预览换回当前图像
+            self.discard_preview()
+            QMessageBox.critical(self, '错误', f'打开图片失败: {error}')
+        else:
+            self.show_loaded_image(path, image, editable)
+
+    def _on_preview_decoded(self, path, size, preview):
+        """预览解码完成（GUI 线程）：完整图像到达前只在标签上显示预览，不改变编辑状态"""
+        if path != self._loading_path:
+            return
+        height, width = preview.shape[:2]
+        # QImage 直接引用数组内存；QPixmap.fromImage 上传时才复制，preview 在此之前一直有效
+        qimage = QImage(preview.data, width, height, preview.strides[0], QImage.Format_RGBA8888)
+        self.image_label.set_pixmap(QPixmap.fromImage(qimage), size[0] * self.scale_factor / width)
+        self._showing_preview = True
+
+    def discard_preview(self):
+        """标签上的预览已不对应任何等待中的加载（加载失败或被取消）时，恢复显示当前图像"""
+        if not self._showing_preview:
+            return
+        self._showing_preview = False
+        if self.image:
+            self.display_image()
+        else:
+            self.image_label.clear()
+
+    def load_image(self, file_path):
+        """加载图片：已缓存时立即显示，否则在后台解码，完成后由 _on_image_decoded 显示
+
+        连续切换图片时只显示最后请求的那一张。
+        """
+        try:
+            path = os.path.normpath(os.path.abspath(file_path))
+            self._loading_path = None
+            if self.is_current_image_unchanged(path):
+                # 已经显示的就是这张图片，且文件和像素都没有变化；
+                # 被取消的加载可能已在标签上显示了预览，换回当前图像
+                self.discard_preview()
+                return
+            image = self.get_cached_image(path)
+            if image is not None:
+                self.show_loaded_image(path, image)
+                return
+            self._loading_path = path
+            # 缩小显示时（缩放比例不超过 1/2）JPEG 先缩小解码出预览，完整解码后再替换
+            preview_scale = self.scale_factor if self.scale_factor <= 0.5 else None
+            self.start_decode(path, priority=1, preview_scale=preview_scale, editable=True)
+            self.show_notification(f"正在加载 {os.path.basename(path)}…")
         except Exception as e:
-            QMessageBox.critical(self, '错误', f'缩放图片失败: {str(e)}')
+            QMessageBox.critical(self, '错误', f'打开图片失败: {str(e)}')
             print(traceback.format_exc())
 
-    def load_image(self, file_path):
+    def is_current_image_unchanged(self, path):
+        """path（已规范化）是否就是当前显示的图片，且文件未被修改、图片也没有被编辑过"""
+        if self.image is None or self._loaded_mtime is None or self.history or self.redo_stack:
+            return False
+        if path != os.path.normpath(os.path.abspath(self.current_image_path or '')):
+            return False
         try:
-            self.image = Image.open(file_path)
+            return os.stat(path).st_mtime_ns == self._loaded_mtime
+        except OSError:
+            return False
+
+    def show_loaded_image(self, file_path, image, editable=None):
+        """显示已解码的图片，并更新路径、图片列表和窗口标题
+
+        editable 是解码线程已复制好的可编辑像素，没有时（命中缓存或沿用预读任务）在这里复制。
+        """
+        try:
+            # 解码时已统一转换为 RGBA，避免在绘制热路径中反复转换；
+            # 交给 set_image 的是副本，之后的编辑不会影响缓存中的像素
+            self.set_image(editable if editable is not None else image.copy())
             self.last_save_path = file_path
             self.current_image_path = file_path  # 设置当前图片路径
-            self.add_to_history()
+            # 解码时读取的文件修改时间（缓存中与像素一起保存）
+            self._loaded_mtime = self._image_cache.get(file_path, (None,))[0]
+            self.reset_history()
             self.display_image()
             self.showMaximized()
 
             # 更新图片列表
             self.update_image_list()
+            self.prefetch_neighbors()
 
             # 更新窗口标题显示图片名称
             self.update_window_title()
@@ -1668,7 +2988,28 @@ class ImageViewer(QMainWindow):
         super().resizeEvent(event)
         # 不再自动重新定位按钮，保持用户设置的位置
 
+    def closeEvent(self, event):
+        """关闭窗口前写入尚未保存的按钮位置"""
+        if self._config_save_timer.isActive():
+            self.write_config()
+        super().closeEvent(event)
+
+def setup_logging(level=logging.WARNING):
+    """配置日志：GUI 线程只把记录放入队列，由后台线程写出，避免界面线程阻塞在输出上"""
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(levelname)s %(name)s: %(message)s'))
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    atexit.register(listener.stop)  # 退出前写完队列中剩余的记录
+    return listener
+
 if __name__ == '__main__':
+    # 调试信息通过 logger.debug 输出，默认只显示警告及以上级别
+    setup_logging()
     try:
         # Windows 任务栏图标设置 - 在创建 QApplication 之前设置
         try:
@@ -1681,10 +3022,9 @@ if __name__ == '__main__':
         app = QApplication(sys.argv)
 
         # 设置应用程序图标
-        icon_path = resource_path('1024x1024.png')
-        if os.path.exists(icon_path):
-            app_icon = QIcon(icon_path)
-            app.setWindowIcon(app_icon)
+        icon = app_icon()
+        if icon is not None:
+            app.setWindowIcon(icon)
 
         image_path = None
         if len(sys.argv) > 1: